@@ -0,0 +1,104 @@
+"""
+Версионированный кэш ответов каталога.
+
+У каждого ресурса (titles, genres, categories) есть счётчик версии.
+Ключ кэша ответа включает текущую версию, поэтому запись, увеличившая
+счётчик, делает все старые ответы ресурса недостижимыми без их перебора.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from rest_framework import permissions, status
+from rest_framework.response import Response
+
+from api_yamdb.settings import RESPONSE_CACHE_TIMEOUT
+
+VERSION_KEY = 'yamdb:version:{}'
+RESPONSE_KEY = 'yamdb:response:{}:{}:{}'
+
+
+def get_version(resource):
+    # Начальная версия от текущего времени: если счётчик вытеснен из кэша,
+    # новая версия не совпадёт со старыми ключами ответов.
+    return cache.get_or_set(
+        VERSION_KEY.format(resource), time.time_ns(), timeout=None)
+
+
+def bump_version(*resources):
+    # Не incr: в файловом и других общих бэкендах он не атомарен, и из двух
+    # параллельных записей одна могла бы не сменить версию. Каждая запись
+    # ставит новое значение, поэтому версия после неё всегда другая.
+    for resource in resources:
+        key = VERSION_KEY.format(resource)
+        current = cache.get(key) or 0
+        cache.set(key, max(time.time_ns(), current + 1), timeout=None)
+
+
+def response_cache_key(resource, request, version=None):
+    query = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    # Схема и хост входят в ключ: ответ содержит абсолютные ссылки
+    # next/previous, построенные по заголовку Host запроса.
+    digest = hashlib.md5(
+        f'{request.scheme}://{request.get_host()}{request.path}?{query}'
+        .encode()).hexdigest()
+    if version is None:
+        version = get_version(resource)
+    return RESPONSE_KEY.format(resource, version, digest)
+
+
+class VersionedCacheMixin:
+    """
+    Кэширует ответы list ресурса cache_resource и после любого успешного
+    изменяющего запроса к вьюсету увеличивает версии ресурсов
+    из cache_invalidates. Другие GET-обработчики подключаются
+    через cached_response.
+    """
+    cache_resource = None
+    cache_invalidates = ()
+    # Действия с небезопасным методом, которые ничего не меняют.
+    cache_readonly_actions = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if self.cache_resource is None:
+            return handler(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def get_cache_key(self, request):
+        return response_cache_key(self.cache_resource, request)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            request.method not in permissions.SAFE_METHODS
+            and getattr(self, 'action', None)
+            not in self.cache_readonly_actions
+            and status.is_success(response.status_code)
+        ):
+            bump_version(*self.cache_invalidates)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class CachedRetrieveMixin(VersionedCacheMixin):
+    """
+    Дополнительно кэширует retrieve.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
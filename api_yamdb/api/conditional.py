@@ -0,0 +1,58 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает 304 на If-None-Match и If-Modified-Since до выборки и
+    сериализации данных. Вьюсет определяет get_last_modified — один дешёвый
+    запрос времени последнего изменения ответа — или get_etag целиком.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_last_modified(self):
+        return None
+
+    def get_etag(self, last_modified):
+        if last_modified is None:
+            return None
+
+        return self.make_etag(last_modified.isoformat())
+
+    def make_etag(self, marker):
+        # Один и тот же маркер даёт разные ответы для разных страниц,
+        # фильтров и форматов.
+        source = '{}|{}|{}'.format(
+            self.request.get_full_path(),
+            self.request.accepted_renderer.format,
+            marker,
+        )
+        return quote_etag(hashlib.md5(source.encode()).hexdigest())
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        last_modified = self.get_last_modified()
+        etag = self.get_etag(last_modified)
+        timestamp = last_modified and int(last_modified.timestamp())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        if etag:
+            response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
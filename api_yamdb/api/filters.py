@@ -1,15 +1,128 @@
+from django.db.models import F
 from django_filters import rest_framework
+from django_filters.constants import EMPTY_VALUES
+from rest_framework import filters
 
-from reviews.models import Title
+from reviews.models import Genre, Review, Title
+from reviews.search import normalize_search_key, search_texts, search_titles
+
+
+class NameSearchFilter(filters.BaseFilterBackend):
+    """
+    Точный поиск по названию через индексированное поле search_name:
+    без учёта регистра, в том числе для кириллицы, и без разницы е/ё.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.search_param, '').strip()
+        if not value:
+            return queryset
+
+        return queryset.filter(search_name=normalize_search_key(value))
 
 
 class TitleFilter(rest_framework.FilterSet):
-    name = rest_framework.CharFilter(field_name='name', lookup_expr='contains')
+    name = rest_framework.CharFilter(method='filter_name')
     category = rest_framework.CharFilter(
         field_name='category__slug', lookup_expr='exact')
     genre = rest_framework.CharFilter(
         field_name='genre__slug', lookup_expr='exact')
+    genre__all = rest_framework.CharFilter(method='filter_genre_all')
+    genre__any = rest_framework.CharFilter(method='filter_genre_any')
+    search = rest_framework.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('name', 'category', 'genre', 'year')
+        fields = (
+            'name', 'category', 'genre', 'genre__all', 'genre__any',
+            'year', 'search',
+        )
+
+    @staticmethod
+    def genre_bits(value):
+        """
+        Биты жанров из списка слагов через запятую. None вместо бита
+        означает жанр вне маски.
+        """
+        slugs = {slug.strip() for slug in value.split(',') if slug.strip()}
+        bits = dict(
+            Genre.objects.filter(slug__in=slugs).values_list('slug', 'bit'))
+        return slugs, bits
+
+    def filter_genre_all(self, queryset, name, value):
+        slugs, bits = self.genre_bits(value)
+        if not slugs:
+            return queryset
+        if len(bits) < len(slugs):
+            return queryset.none()
+
+        if None in bits.values():
+            # Запасной путь: по соединению на каждый жанр.
+            for slug in slugs:
+                queryset = queryset.filter(genre__slug=slug)
+            return queryset
+
+        mask = sum(1 << bit for bit in bits.values())
+        return queryset.annotate(
+            genre_all_bits=F('genre_mask').bitand(mask)
+        ).filter(genre_all_bits=mask)
+
+    def filter_genre_any(self, queryset, name, value):
+        slugs, bits = self.genre_bits(value)
+        if not slugs:
+            return queryset
+        if not bits:
+            return queryset.none()
+
+        if None in bits.values():
+            return queryset.filter(pk__in=Title.genre.through.objects.filter(
+                genre__slug__in=bits).values('title'))
+
+        mask = sum(1 << bit for bit in bits.values())
+        return queryset.annotate(
+            genre_any_bits=F('genre_mask').bitand(mask)
+        ).exclude(genre_any_bits=0)
+
+    def filter_name(self, queryset, name, value):
+        # Поиск подстроки, как и до появления search_name: нормализованный
+        # ключ только убирает зависимость от регистра и е/ё.
+        return queryset.filter(
+            search_name__contains=normalize_search_key(value))
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
+
+
+class StableOrderingFilter(rest_framework.OrderingFilter):
+    """
+    Дополняет сортировку id в том же направлении, что и последнее поле:
+    порядок страниц однозначен, а индекс (..., поле) с неявным id в конце
+    обходится без отдельной сортировки.
+    """
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+
+        ordering = [self.get_ordering_value(param) for param in value]
+        tie_breaker = '-pk' if ordering[-1].startswith('-') else 'pk'
+        return qs.order_by(*ordering, tie_breaker)
+
+
+class ReviewFilter(rest_framework.FilterSet):
+    score = rest_framework.RangeFilter()
+    author = rest_framework.CharFilter(
+        field_name='author__username', lookup_expr='exact')
+    pub_date = rest_framework.IsoDateTimeFromToRangeFilter()
+    # Сортирует по релевантности; явный ordering применяется позже
+    # и заменяет её.
+    search = rest_framework.CharFilter(method='filter_search')
+    ordering = StableOrderingFilter(fields=('pub_date', 'score'))
+
+    class Meta:
+        model = Review
+        fields = ('score', 'author', 'pub_date', 'search')
+
+    def filter_search(self, queryset, name, value):
+        return search_texts(queryset, value)
@@ -0,0 +1,40 @@
+"""
+Массовая модерация отзывов и комментариев.
+
+Записи обрабатываются порциями, каждая в своей транзакции: блокировка
+записи SQLite не держится на всё время операции, а сбой откатывает
+только текущую порцию. Рейтинги произведений и счётчики комментариев
+пересчитываются один раз на порцию для каждого затронутого произведения
+или отзыва, а не по каждой записи.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.models import Review
+from reviews.signals import deferred_updates
+
+MODERATION_ACTIONS = ('delete', 'hide', 'show')
+MODERATION_MAX_IDS = 5000
+MODERATION_CHUNK_SIZE = 500
+
+
+def moderate(queryset, action, chunk_size=MODERATION_CHUNK_SIZE):
+    """
+    Применяет action к записям queryset и возвращает их число.
+    Удаление идёт через QuerySet.delete(), поэтому каскад и сигналы
+    срабатывают как обычно; скрытие и показ — одним UPDATE на порцию.
+    """
+    model = queryset.model
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), chunk_size):
+        chunk = model.objects.filter(pk__in=ids[start:start + chunk_size])
+        with transaction.atomic(), deferred_updates() as pending:
+            if action == 'delete':
+                chunk.delete()
+            else:
+                parent = 'title_id' if model is Review else 'review_id'
+                pending['titles' if model is Review else 'reviews'].update(
+                    chunk.values_list(parent, flat=True).distinct())
+                chunk.update(
+                    is_hidden=action == 'hide', updated_at=timezone.now())
+    return len(ids)
@@ -1,5 +1,190 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PkCountPaginator(Paginator):
+    """
+    Считает записи по values('pk'): с аннотациями queryset Django строит
+    COUNT по подзапросу, сгруппированному по ним, а ранг и фрагмент FTS5
+    в GROUP BY вычислить нельзя.
+    """
+
+    @cached_property
+    def count(self):
+        return self.object_list.values('pk').count()
 
 
 class YamdbPagination(PageNumberPagination):
     page_size = 10
+    django_paginator_class = PkCountPaginator
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу: следующая страница выбирается условием по полям
+    ordering последней записи, поэтому обходится без OFFSET и COUNT(*).
+    Порядок должен быть уникальным, а под него должен быть индекс.
+    Курсор хранит и сам порядок: курсор, полученный при другом порядке,
+    отклоняется.
+    """
+    page_size = 10
+    cursor_query_param = 'cursor'
+    ordering = ('id',)
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_ordering(self, queryset):
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            position = self.clean_position(queryset, position)
+            queryset = queryset.filter(self.position_filter(position))
+
+        items = list(queryset[:self.page_size + 1])
+        self.has_next = len(items) > self.page_size
+        self.page = items[:self.page_size]
+        return self.page
+
+    def position_filter(self, position):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+
+        # Избыточная граница по первому полю даёт диапазон по индексу:
+        # по одному OR SQLite просматривает индекс с начала.
+        first = self.ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & condition
+
+    def clean_position(self, queryset, position):
+        """
+        Приводит значения курсора к типам полей ordering: курсор
+        с чужими значениями даёт 404, а не ошибку при построении запроса.
+        """
+        values = []
+        for field, value in zip(self.ordering, position):
+            output_field = queryset.query.resolve_ref(
+                field.lstrip('-')).output_field
+            try:
+                value = output_field.to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(cursor, dict) or (
+                cursor.get('ordering') != list(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        position = cursor.get('position')
+        if not isinstance(position, list) or (
+                len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, instance):
+        cursor = {
+            'ordering': list(self.ordering),
+            'position': [
+                getattr(instance, field.lstrip('-'))
+                for field in self.ordering
+            ],
+        }
+        return base64.urlsafe_b64encode(
+            json.dumps(cursor, default=str).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class TitleKeysetPagination(KeysetPagination):
+    ordering = ('year', 'id')
+
+
+class ReviewKeysetPagination(KeysetPagination):
+    """
+    Порядок берётся из queryset: его задают get_queryset и ReviewFilter,
+    и он всегда заканчивается на pk. Под (-pub_date, -pk) и (score, pk)
+    есть индексы (title, pub_date) и (title, score); при поиске порядок
+    (search_rank, pk).
+    """
+
+    def get_ordering(self, queryset):
+        return tuple(queryset.query.order_by)
+
+
+class CommentKeysetPagination(KeysetPagination):
+    ordering = ('-pub_date', '-id')
+
+
+class KeysetPaginationMixin:
+    """
+    Переключает вьюсет на keyset_pagination_class, если в запросе передан
+    параметр cursor (для первой страницы — пустой: ?cursor=).
+    """
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        keyset_class = self.keyset_pagination_class
+        if (
+            not hasattr(self, '_paginator')
+            and keyset_class is not None
+            and keyset_class.cursor_query_param in self.request.query_params
+        ):
+            self._paginator = keyset_class()
+
+        return super().paginator
@@ -24,6 +24,15 @@ class OnlyForAdmin(permissions.BasePermission):
         return is_admin(request.user)
 
 
+class OnlyForStaff(permissions.BasePermission):
+    """
+    Действия доступны модераторам и админам.
+    """
+
+    def has_permission(self, request, view):
+        return is_staff(request.user)
+
+
 class ReadOnly(permissions.BasePermission):
     """
     Обычным пользователям разрешено только чтение.
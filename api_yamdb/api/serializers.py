@@ -1,9 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from rest_framework.relations import SlugRelatedField
 
 from reviews.models import Category, Comment, Review, Genre, Title
+from reviews.search import highlight, index_titles, normalize_search_key
+
+from .export import EXPORT_FORMATS
+from .moderation import MODERATION_ACTIONS, MODERATION_MAX_IDS
 
 User = get_user_model()
 
@@ -54,30 +59,30 @@ class UserSerializer(serializers.ModelSerializer):
         return username
 
 
-class ReviewSerializer(serializers.ModelSerializer):
-    author = SlugRelatedField(slug_field='username', read_only=True)
+class SearchSnippetMixin:
+    """
+    Добавляет поле snippet — фрагмент текста с выделенными совпадениями,
+    если запись найдена полнотекстовым поиском.
+    """
 
-    class Meta:
-        fields = ('id', 'text', 'author', 'score', 'pub_date')
-        model = Review
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        snippet = getattr(instance, 'search_snippet', None)
+        if snippet is not None:
+            data['snippet'] = highlight(snippet)
+        return data
 
-    def validate(self, data):
-        super().validate(data)
 
-        if self.context['request'].method != 'POST':
-            return data
+class ReviewSerializer(SearchSnippetMixin, serializers.ModelSerializer):
+    author = SlugRelatedField(slug_field='username', read_only=True)
 
-        user = self.context['request'].user
-        title_id = (
-            self.context['request'].parser_context['kwargs']['title_id']
-        )
-        if Review.objects.filter(author=user, title__id=title_id).exists():
-            raise serializers.ValidationError(
-                'Вы уже оставили отзыв на данное произведение!')
-        return data
+    class Meta:
+        fields = (
+            'id', 'text', 'author', 'score', 'pub_date', 'comments_count')
+        model = Review
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SearchSnippetMixin, serializers.ModelSerializer):
     author = SlugRelatedField(slug_field='username', read_only=True)
 
     class Meta:
@@ -85,6 +90,19 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
 
 
+class ReviewSearchSerializer(ReviewSerializer):
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ('title', *ReviewSerializer.Meta.fields)
+
+
+class CommentSearchSerializer(CommentSerializer):
+    title = serializers.IntegerField(read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        fields = ('title', 'review', *CommentSerializer.Meta.fields)
+
+
 class GenreSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -102,13 +120,62 @@ class CategorySerializer(serializers.ModelSerializer):
 class TitleReadSerializer(serializers.ModelSerializer):
     genre = GenreSerializer(many=True)
     category = CategorySerializer(read_only=True)
-    rating = serializers.IntegerField(
-        source='reviews__score__avg', read_only=True)
+    rating = serializers.IntegerField(read_only=True)
 
     class Meta:
-        fields = '__all__'
+        fields = (
+            'id', 'name', 'year', 'rating', 'weighted_rating',
+            'reviews_count', 'description', 'genre', 'category',
+        )
         model = Title
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    category = serializers.SlugField(required=False)
+    genre = serializers.SlugField(required=False)
+
+
+class TitleIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=500)
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    output = serializers.ChoiceField(
+        choices=tuple(EXPORT_FORMATS), default='ndjson')
+    after = serializers.IntegerField(min_value=0, default=0)
+    title = serializers.IntegerField(min_value=1, required=False)
+    review = serializers.IntegerField(min_value=1, required=False)
+
+
+class ModerationSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=MODERATION_ACTIONS)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=MODERATION_MAX_IDS, required=False)
+    author = serializers.SlugRelatedField(
+        slug_field='username', queryset=User.objects.all(), required=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('author' in data):
+            raise serializers.ValidationError(
+                'Укажите либо ids, либо author.')
+        return data
+
+
+class TextSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    title = serializers.IntegerField(min_value=1, required=False)
+
 
 class TitleWriteSerializer(serializers.ModelSerializer):
     genre = serializers.SlugRelatedField(
@@ -117,5 +184,162 @@ class TitleWriteSerializer(serializers.ModelSerializer):
         slug_field='slug', queryset=Category.objects.all())
 
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
         model = Title
+
+
+class TitleBulkListSerializer(serializers.ListSerializer):
+    """
+    Пакетная запись произведений: новые вставляются через bulk_create,
+    существующие обновляются через bulk_update, связи с жанрами пишутся
+    в промежуточную таблицу пачками. Ошибки возвращаются списком
+    по позициям входных данных.
+    """
+    chunk_size = 500
+
+    def to_internal_value(self, data):
+        # Проверка id здесь, а не в validate: ошибки validate DRF сводит
+        # в non_field_errors, а нужен список по позициям. Элементы
+        # проверяются по одному, как в ListSerializer, и ошибки id
+        # добавляются к ошибкам полей той же позиции, чтобы клиент
+        # получил все ошибки пакета одним ответом.
+        if not isinstance(data, list) or not data:
+            return super().to_internal_value(data)
+
+        items, errors = [], []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                errors.append(exc.detail)
+
+        for error, id_error in zip(errors, self.check_ids(data)):
+            if id_error and 'id' not in error:
+                error['id'] = [id_error]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def check_ids(self, data):
+        """
+        Ошибка id для каждой позиции: произведение не найдено или
+        указано дважды. Id берутся из исходных данных, поэтому
+        проверяются и у элементов с ошибками в других полях.
+        """
+        ids = []
+        for item in data:
+            try:
+                ids.append(self.child.fields['id'].to_internal_value(
+                    item.get('id') if isinstance(item, dict) else None))
+            except serializers.ValidationError:
+                ids.append(None)
+
+        existing = set(Title.objects.filter(
+            pk__in={pk for pk in ids if pk is not None}
+        ).values_list('pk', flat=True))
+        seen = set()
+        for pk in ids:
+            if pk is not None and pk not in existing:
+                yield 'Произведение не найдено.'
+            elif pk is not None and pk in seen:
+                yield 'Произведение указано дважды.'
+            else:
+                yield None
+            seen.add(pk)
+
+    def create(self, validated_data):
+        created, updated = [], []
+        for start in range(0, len(validated_data), self.chunk_size):
+            chunk = validated_data[start:start + self.chunk_size]
+            created += self.create_titles(
+                [item for item in chunk if 'id' not in item])
+            updated += self.update_titles(
+                [item for item in chunk if 'id' in item])
+        return created, updated
+
+    @staticmethod
+    def build_title(item, title=None):
+        title = title or Title()
+        for field in ('name', 'year', 'description', 'category'):
+            if field in item:
+                setattr(title, field, item[field])
+        title.search_name = normalize_search_key(title.name)
+        title.updated_at = timezone.now()
+        return title
+
+    def create_titles(self, items):
+        if not items:
+            return []
+
+        titles = Title.objects.bulk_create(
+            [self.build_title(item) for item in items])
+        if titles[0].pk is None:
+            # Django 2.2 не получает id из bulk_create на SQLite. Запись
+            # в SQLite внутри транзакции монопольна, поэтому только что
+            # вставленные строки — последние по id.
+            ids = Title.objects.order_by('-pk').values_list(
+                'pk', flat=True)[:len(titles)]
+            for title, pk in zip(titles, reversed(ids)):
+                title.pk = pk
+
+        self.write_genres(titles, items)
+        return titles
+
+    def update_titles(self, items):
+        if not items:
+            return []
+
+        existing = Title.objects.in_bulk([item['id'] for item in items])
+        titles = [
+            self.build_title(item, existing[item['id']]) for item in items
+        ]
+        Title.objects.bulk_update(titles, [
+            'name', 'year', 'description', 'category',
+            'search_name', 'updated_at',
+        ])
+        Title.genre.through.objects.filter(title__in=titles).delete()
+        self.write_genres(titles, items)
+        return titles
+
+    @staticmethod
+    def write_genres(titles, items):
+        Title.genre.through.objects.bulk_create(
+            Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+            for title, item in zip(titles, items)
+            for genre in item['genre']
+        )
+        Title.objects.filter(
+            pk__in=[title.pk for title in titles]).sync_genres()
+        index_titles(titles)
+
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """
+    Элемент пакетной записи. Жанры и категория ищутся в словарях
+    из контекста, поэтому проверка элемента не ходит в базу.
+    """
+    id = serializers.IntegerField(required=False, min_value=1)
+    genre = serializers.ListField(child=serializers.SlugField())
+    category = serializers.SlugField()
+
+    class Meta:
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
+        model = Title
+        list_serializer_class = TitleBulkListSerializer
+
+    def validate_genre(self, slugs):
+        genres = self.context['genres']
+        unknown = [slug for slug in slugs if slug not in genres]
+        if unknown:
+            raise serializers.ValidationError(
+                f'Жанры не найдены: {", ".join(unknown)}')
+        return [genres[slug] for slug in dict.fromkeys(slugs)]
+
+    def validate_category(self, slug):
+        category = self.context['categories'].get(slug)
+        if category is None:
+            raise serializers.ValidationError(
+                f'Категория не найдена: {slug}')
+        return category
@@ -10,6 +10,12 @@ from .views import (
     UserViewSet,
     auth_signup,
     auth_get_token,
+    export_comments,
+    export_reviews,
+    moderate_comments,
+    moderate_reviews,
+    search_comments,
+    search_reviews,
 )
 
 
@@ -29,4 +35,12 @@ urlpatterns = [
     path('v1/', include(router.urls)),
     path('v1/auth/signup/', auth_signup, name='signup'),
     path('v1/auth/token/', auth_get_token, name='token'),
+    path('v1/export/reviews/', export_reviews, name='export-reviews'),
+    path('v1/export/comments/', export_comments, name='export-comments'),
+    path('v1/search/reviews/', search_reviews, name='search-reviews'),
+    path('v1/search/comments/', search_comments, name='search-comments'),
+    path('v1/moderation/reviews/', moderate_reviews,
+         name='moderate-reviews'),
+    path('v1/moderation/comments/', moderate_comments,
+         name='moderate-comments'),
 ]
@@ -2,12 +2,15 @@ from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import transaction
+from django.db.models import F, Prefetch
 from django.db.utils import IntegrityError
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, filters, status, mixins
+from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.permissions import (
     IsAuthenticated,
     AllowAny,
@@ -15,31 +18,74 @@ from rest_framework.permissions import (
 )
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .filters import TitleFilter
+from .cache import (
+    CachedRetrieveMixin,
+    VersionedCacheMixin,
+    bump_version,
+    get_version,
+    response_cache_key,
+)
+from .conditional import ConditionalGetMixin
+from .export import (
+    COMMENT_EXPORT_FIELDS,
+    REVIEW_EXPORT_FIELDS,
+    export_response,
+)
+from .facets import FACETS, get_facets
+from .filters import NameSearchFilter, ReviewFilter, TitleFilter
+from .moderation import moderate
 
 from .serializers import (
     CategorySerializer,
+    CommentSearchSerializer,
     CommentSerializer,
+    ExportQuerySerializer,
     GenreSerializer,
+    LeaderboardQuerySerializer,
+    ModerationSerializer,
+    TitleBulkSerializer,
+    TitleIdsSerializer,
+    ReviewSearchSerializer,
     ReviewSerializer,
     TitleReadSerializer,
     TitleWriteSerializer,
     UserSerializer,
     SignUpSerializer,
+    TextSearchQuerySerializer,
     TokenSerializer,
 )
-from reviews.models import Category, Genre, Review, Title
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    GenreRanking,
+    Review,
+    SimilarTitle,
+    Title,
+)
+from reviews.search import search_texts
+from reviews.signals import deferred_updates
 from .permissions import (
     OnlyForAdmin,
+    OnlyForStaff,
     IsAuthorOrReadOnly,
     ReadOnly,
     NoRoleChange
 )
-from .pagination import YamdbPagination
+from .pagination import (
+    CommentKeysetPagination,
+    KeysetPaginationMixin,
+    ReviewKeysetPagination,
+    TitleKeysetPagination,
+    YamdbPagination,
+)
 from api_yamdb.settings import SITE_EMAIL
 
 User = get_user_model()
 
+BULK_TITLES_LIMIT = 5000
+DUPLICATE_REVIEW = 'Вы уже оставили отзыв на данное произведение!'
+
 
 class CreateDestroyListViewSet(
     mixins.CreateModelMixin,
@@ -50,6 +96,19 @@ class CreateDestroyListViewSet(
     pass
 
 
+class DeferredDestroyMixin:
+    """
+    Удаляет объект вместе с каскадом в одной транзакции с отложенными
+    пересчётами: рейтинги, счётчики комментариев и поисковый индекс
+    обновляются один раз на произведение, отзыв и модель, а не по каждой
+    каскадно удалённой записи.
+    """
+
+    def perform_destroy(self, instance):
+        with transaction.atomic(), deferred_updates():
+            instance.delete()
+
+
 def sending_mail(email, confrimation_code):
     try:
         send_mail(
@@ -122,7 +181,7 @@ def auth_get_token(request):
     return Response('Неверный код', status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(DeferredDestroyMixin, viewsets.ModelViewSet):
     permission_classes = (OnlyForAdmin,)
     queryset = User.objects.all().order_by('date_joined')
     serializer_class = UserSerializer
@@ -153,72 +212,432 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save(role=user.role, partial=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(
+        detail=False,
+        url_path='me/recommendations',
+        permission_classes=(IsAuthenticated,)
+    )
+    def recommendations(self, request):
+        # Рекомендации строятся офлайн: произведения, оценённые после
+        # расчёта, отбрасываются при чтении.
+        titles = Title.objects.filter(
+            recommendations__user=request.user
+        ).exclude(
+            reviews__author=request.user
+        ).select_related('category').prefetch_related('genre').order_by(
+            '-recommendations__score', 'id')
+        serializer = TitleReadSerializer(
+            titles, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+
+def moderation_response(request, queryset, cache_invalidates=()):
+    serializer = ModerationSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    if 'ids' in data:
+        queryset = queryset.filter(pk__in=data['ids'])
+    else:
+        queryset = queryset.filter(author=data['author'])
+    count = moderate(queryset, data['action'])
+    if count:
+        bump_version(*cache_invalidates)
+    return Response({'action': data['action'], 'count': count})
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+@api_view(['POST'])
+@permission_classes([OnlyForStaff])
+def moderate_reviews(request):
+    # Скрытие и удаление отзывов меняют рейтинги произведений.
+    return moderation_response(request, Review.objects.all(), ('titles',))
+
+
+@api_view(['POST'])
+@permission_classes([OnlyForStaff])
+def moderate_comments(request):
+    return moderation_response(request, Comment.objects.all())
+
+
+def text_search_response(request, queryset, serializer_class):
+    query = TextSearchQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    if 'title' in query.validated_data:
+        queryset = queryset.filter(title=query.validated_data['title'])
+    queryset = search_texts(queryset, query.validated_data['q'])
+
+    paginator = YamdbPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(
+        page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_reviews(request):
+    return text_search_response(
+        request, Review.objects.visible().select_related('author'),
+        ReviewSearchSerializer)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_comments(request):
+    # Произведение берётся из отзыва в том же запросе: по нему
+    # и фильтруется, и отдаётся в ответе.
+    comments = Comment.objects.visible().filter(
+        review__is_hidden=False
+    ).annotate(title=F('review__title')).select_related('author')
+    return text_search_response(
+        request, comments, CommentSearchSerializer)
+
+
+@api_view(['GET'])
+@permission_classes([OnlyForStaff])
+def export_reviews(request):
+    query = ExportQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    reviews = Review.objects.visible()
+    if 'title' in query.validated_data:
+        reviews = reviews.filter(title=query.validated_data['title'])
+    return export_response(
+        reviews, REVIEW_EXPORT_FIELDS, query.validated_data['output'],
+        query.validated_data['after'], 'reviews')
+
+
+@api_view(['GET'])
+@permission_classes([OnlyForStaff])
+def export_comments(request):
+    query = ExportQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    comments = Comment.objects.visible().filter(review__is_hidden=False)
+    if 'title' in query.validated_data:
+        comments = comments.filter(
+            review__title=query.validated_data['title'])
+    if 'review' in query.validated_data:
+        comments = comments.filter(review=query.validated_data['review'])
+    return export_response(
+        comments, COMMENT_EXPORT_FIELDS, query.validated_data['output'],
+        query.validated_data['after'], 'comments')
+
+
+class ReviewViewSet(
+    DeferredDestroyMixin,
+    KeysetPaginationMixin,
+    ConditionalGetMixin,
+    VersionedCacheMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = ReviewSerializer
     pagination_class = YamdbPagination
+    keyset_pagination_class = ReviewKeysetPagination
     permission_classes = (IsAuthorOrReadOnly, IsAuthenticatedOrReadOnly)
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('=name',)
+    cache_invalidates = ('titles',)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = ReviewFilter
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        # Произведение нужно только как внешний ключ: проверяется, что оно
+        # есть, но строка целиком не загружается.
+        title_id = self.kwargs.get('title_id')
+        get_object_or_404(Title.objects.filter(pk=title_id).values('pk'))
+        # Повторный отзыв отсекает ограничение unique_name_reviews, а не
+        # проверка перед вставкой: так нет лишнего запроса и гонки между
+        # параллельными запросами.
+        try:
+            with transaction.atomic():
+                serializer.save(author=self.request.user, title_id=title_id)
+        except IntegrityError:
+            if not Review.objects.filter(
+                author=self.request.user, title=title_id
+            ).exists():
+                raise
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [DUPLICATE_REVIEW]})
+
+    def get_last_modified(self):
+        if self.action == 'list':
+            queryset = Title.objects.filter(pk=self.kwargs.get('title_id'))
+        else:
+            queryset = Review.objects.visible().filter(
+                pk=self.kwargs.get('pk'), title=self.kwargs.get('title_id'))
+        return get_object_or_404(
+            queryset.values_list('updated_at', flat=True))
 
     def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        queryset = title.reviews.all()
-        return queryset
-
-
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(
-        Avg('reviews__score')).order_by('year')
+        # Существование произведения для списка проверяет get_last_modified
+        # одним запросом по первичному ключу; здесь отзывы выбираются
+        # по title_id вместе с авторами.
+        return Review.objects.visible().filter(
+            title=self.kwargs.get('title_id')
+        ).select_related('author').order_by('-pub_date', '-pk')
+
+
+class TitleViewSet(
+    DeferredDestroyMixin,
+    KeysetPaginationMixin,
+    ConditionalGetMixin,
+    CachedRetrieveMixin,
+    viewsets.ModelViewSet
+):
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre').order_by('year', 'id')
     pagination_class = YamdbPagination
+    keyset_pagination_class = TitleKeysetPagination
+    cache_resource = 'titles'
+    cache_invalidates = ('titles',)
+    cache_readonly_actions = ('bulk_get',)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
     permission_classes = (ReadOnly,)
+    read_actions = ('list', 'retrieve', 'top', 'similar', 'bulk_get')
+    # Поля TitleReadSerializer, которые хранятся в колонках reviews_title.
+    column_fields = {
+        'name', 'year', 'rating', 'weighted_rating',
+        'reviews_count', 'description',
+    }
+
+    def get_requested_fields(self):
+        """
+        Поля из параметра ?fields=name,year или None, если он не передан.
+        """
+        value = self.request.query_params.get('fields')
+        if self.action not in self.read_actions or not value:
+            return None
+
+        fields = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = fields - set(TitleReadSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Неизвестные поля: {", ".join(sorted(unknown))}'})
+        return fields
+
+    def get_queryset(self):
+        fields = self.get_requested_fields()
+        if not fields:
+            return super().get_queryset()
+
+        # id и year нужны всегда: это порядок списка и ключ курсора.
+        columns = {'id', 'year'} | (fields & self.column_fields)
+        queryset = Title.objects.order_by('year', 'id')
+        if 'category' in fields:
+            queryset = queryset.select_related('category')
+            columns |= {'category', 'category__name', 'category__slug'}
+        if 'genre' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'genre', queryset=Genre.objects.only('name', 'slug')))
+        return queryset.only(*columns)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_requested_fields()
+        return context
+
+    def get_requested_facets(self):
+        value = self.request.query_params.get('facets')
+        if not value:
+            return None
+
+        facets = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(facets) - set(FACETS)
+        if unknown:
+            raise ValidationError({
+                'facets': f'Неизвестные фасеты: {", ".join(sorted(unknown))}'
+            })
+        return list(dict.fromkeys(facets))
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        facets = self.get_requested_facets()
+        if self.action == 'list' and facets:
+            titles = self.filter_queryset(Title.objects.all())
+            response.data['facets'] = get_facets(self.request, titles, facets)
+        return response
+
+    def get_last_modified(self):
+        if self.action != 'retrieve':
+            return None
+
+        # Запоминается: из него же строится ключ кэша карточки.
+        self.last_modified = get_object_or_404(Title.objects.filter(
+            pk=self.kwargs.get('pk')).values_list('updated_at', flat=True))
+        return self.last_modified
+
+    def get_response_version(self):
+        """
+        Общая версия ETag и ключа кэша ответа. У карточки к версии titles
+        добавляется updated_at: пересчёты рейтингов и жанров в обход
+        вьюсета меняют его, но не версию.
+        """
+        version = get_version(self.cache_resource)
+        if self.action == 'retrieve':
+            return f'{version}:{self.last_modified.isoformat()}'
+        return version
+
+    def get_etag(self, last_modified):
+        return self.make_etag(self.get_response_version())
+
+    def get_cache_key(self, request):
+        return response_cache_key(
+            self.cache_resource, request, self.get_response_version())
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in self.read_actions:
             return TitleReadSerializer
         return TitleWriteSerializer
 
+    @action(detail=False, url_path='top')
+    def top(self, request):
+        query = LeaderboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        limit = query.validated_data['limit']
+        genre = query.validated_data.get('genre')
+        category = query.validated_data.get('category')
+
+        if genre:
+            rankings = GenreRanking.objects.filter(
+                genre__slug=genre, rating__isnull=False)
+            if category:
+                rankings = rankings.filter(title__category__slug=category)
+            title_ids = list(rankings.order_by(
+                '-rating', 'title').values_list('title', flat=True)[:limit])
+            titles = self.get_queryset().in_bulk(title_ids)
+            titles = [
+                titles[title_id] for title_id in title_ids
+                if title_id in titles
+            ]
+        else:
+            titles = self.get_queryset().filter(rating__isnull=False)
+            if category:
+                titles = titles.filter(category__slug=category)
+            titles = titles.order_by('-rating', 'id')[:limit]
+
+        serializer = self.get_serializer(titles, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, url_path='similar')
+    def similar(self, request, pk=None):
+        title_ids = list(SimilarTitle.objects.filter(title=pk).order_by(
+            '-score', 'similar').values_list('similar', flat=True))
+        if not title_ids:
+            get_object_or_404(Title, pk=pk)
+
+        titles = self.get_queryset().in_bulk(title_ids)
+        serializer = self.get_serializer(
+            [
+                titles[title_id] for title_id in title_ids
+                if title_id in titles
+            ],
+            many=True)
+        return Response(serializer.data)
+
+    @action(
+        methods=['post'],
+        detail=False,
+        url_path='bulk-get',
+        permission_classes=(AllowAny,)
+    )
+    def bulk_get(self, request):
+        query = TitleIdsSerializer(data=request.data)
+        query.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(query.validated_data['ids']))
+
+        titles = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [titles[pk] for pk in ids if pk in titles], many=True)
+        return Response(serializer.data)
 
-class GenreViewSet(CreateDestroyListViewSet):
+    @action(
+        methods=['post'],
+        detail=False,
+        url_path='bulk',
+        permission_classes=(OnlyForAdmin,)
+    )
+    def bulk(self, request):
+        if (
+            isinstance(request.data, list)
+            and len(request.data) > BULK_TITLES_LIMIT
+        ):
+            return Response(
+                f'Не больше {BULK_TITLES_LIMIT} произведений за запрос',
+                status=status.HTTP_400_BAD_REQUEST)
+
+        context = {
+            'genres': Genre.objects.in_bulk(field_name='slug'),
+            'categories': Category.objects.in_bulk(field_name='slug'),
+        }
+        serializer = TitleBulkSerializer(
+            data=request.data, many=True, context=context)
+        with transaction.atomic():
+            serializer.is_valid(raise_exception=True)
+            created, updated = serializer.save()
+
+        return Response({
+            'created': [title.pk for title in created],
+            'updated': [title.pk for title in updated],
+        }, status=status.HTTP_201_CREATED)
+
+
+class GenreViewSet(VersionedCacheMixin, CreateDestroyListViewSet):
     queryset = Genre.objects.get_queryset().order_by('id')
     lookup_field = 'slug'
+    cache_resource = 'genres'
+    cache_invalidates = ('genres', 'titles')
     serializer_class = GenreSerializer
     pagination_class = YamdbPagination
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('=name',)
+    filter_backends = (NameSearchFilter,)
     permission_classes = (ReadOnly,)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    DeferredDestroyMixin,
+    KeysetPaginationMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = CommentSerializer
     pagination_class = YamdbPagination
+    keyset_pagination_class = CommentKeysetPagination
     permission_classes = (IsAuthorOrReadOnly, IsAuthenticatedOrReadOnly)
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
         review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, pk=review_id, title__id=title_id)
-        serializer.save(author=self.request.user, review=review)
+        get_object_or_404(Review.objects.visible().filter(
+            pk=review_id, title=self.kwargs.get('title_id')).values('pk'))
+        # Комментарий и счётчик comments_count отзыва меняются вместе.
+        with transaction.atomic():
+            serializer.save(author=self.request.user, review_id=review_id)
 
-    def get_queryset(self):
+    def get_last_modified(self):
         title_id = self.kwargs.get('title_id')
         review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, pk=review_id, title__id=title_id)
-        queryset = review.comments.all()
-        return queryset
+        if self.action == 'list':
+            queryset = Review.objects.visible().filter(
+                pk=review_id, title=title_id)
+        else:
+            queryset = Comment.objects.visible().filter(
+                pk=self.kwargs.get('pk'), review=review_id,
+                review__title=title_id, review__is_hidden=False)
+        return get_object_or_404(
+            queryset.values_list('updated_at', flat=True))
+
+    def get_queryset(self):
+        # Пара произведение–отзыв проверяется в том же запросе через
+        # reviews_review.title_id, без соединения с произведением.
+        # Для списка несуществующий отзыв даёт 404 в get_last_modified.
+        return Comment.objects.visible().filter(
+            review=self.kwargs.get('review_id'),
+            review__title=self.kwargs.get('title_id'),
+            review__is_hidden=False,
+        ).select_related('author').order_by('-pub_date', '-pk')
 
 
-class CategoryViewSet(CreateDestroyListViewSet):
+class CategoryViewSet(VersionedCacheMixin, CreateDestroyListViewSet):
     queryset = Category.objects.get_queryset().order_by('id')
     lookup_field = 'slug'
+    cache_resource = 'categories'
+    cache_invalidates = ('categories', 'titles')
     serializer_class = CategorySerializer
     pagination_class = YamdbPagination
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('=name',)
+    filter_backends = (NameSearchFilter,)
     permission_classes = (ReadOnly,)
@@ -29,7 +29,7 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'django_filters',
     'api',
-    'reviews',
+    'reviews.apps.ReviewsConfig',
     'users',
 ]
 
@@ -71,6 +71,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Тестовая база в файле: у базы в памяти параллельные запросы
+        # получают «database table is locked» вместо ожидания блокировки.
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
@@ -103,6 +108,26 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Версии ресурсов в кэше должны быть общими для всех процессов сервера:
+# у LocMemCache кэш свой в каждом процессе, и запись, обработанная одним
+# процессом, не сбрасывала бы ответы, закэшированные другими. Файловый
+# кэш общий для процессов одного хоста; при нескольких хостах укажите
+# общий бэкенд (Memcached, Redis) в CACHE_BACKEND и CACHE_LOCATION.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    }
+}
+
+# Сколько секунд хранятся закэшированные ответы каталога. Записи через API
+# сбрасывают кэш сразу, а таймаут ограничивает устаревание после записей
+# в обход API (админка, shell).
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
@@ -0,0 +1,44 @@
+"""
+Обмен данными между базой и массивами NumPy для офлайн-расчётов.
+"""
+import numpy as np
+from django.db import connection
+
+
+def load_columns(queryset, chunk_size):
+    """
+    Выполняет values_list-запрос курсором и читает строки порциями
+    в целочисленный массив (строки × столбцы), минуя создание объектов
+    модели.
+    """
+    sql, params = queryset.query.sql_with_params()
+    width = len(queryset.query.values_select)
+    chunks = []
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.int64))
+
+    if not chunks:
+        return np.empty((0, width), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def insert_rows(model, columns, rows, batch_size):
+    """
+    Вставляет строки пачками параметризованного INSERT через executemany:
+    bulk_create создаёт объект модели на каждую строку.
+    """
+    qn = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        qn(model._meta.db_table),
+        ', '.join(qn(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    rows = list(rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
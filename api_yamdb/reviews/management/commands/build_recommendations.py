@@ -0,0 +1,401 @@
+import multiprocessing
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Count, Max
+
+from reviews.arrays import insert_rows, load_columns
+from reviews.models import (
+    Recommendation,
+    RecommendationState,
+    Review,
+    TitleFactors,
+)
+
+OTHER_SIDE = {'users': 'titles', 'titles': 'users'}
+# Сколько предсказанных оценок считать за раз при выборе top-N.
+RECOMMEND_BLOCK = 4_000_000
+# Сколько id подставлять в один запрос author__in.
+ID_BATCH = 500
+
+# Данные для процессов-исполнителей. Они наследуются при fork, а матрицы
+# факторов лежат в разделяемой памяти, поэтому процессы пишут свои блоки
+# прямо в общий массив и ничего не пересылают обратно.
+_shared = {}
+
+
+class Ratings:
+    """
+    Оценки одной стороны матрицы (пользователи или произведения)
+    в формате CSR: оценки строки row — cols[ptr[row]:ptr[row + 1]]
+    и values в тех же позициях.
+    """
+
+    def __init__(self, rows, cols, values, size):
+        order = np.argsort(rows, kind='stable')
+        self.ptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(rows, minlength=size))))
+        self.cols = cols[order]
+        self.values = values[order].astype(np.float64)
+        self.size = size
+
+    def blocks(self, max_entries):
+        start = 0
+        while start < self.size:
+            limit = self.ptr[start] + max_entries
+            end = np.searchsorted(self.ptr, limit, side='right') - 1
+            end = min(max(end, start + 1), self.size)
+            yield start, end
+            start = end
+
+
+def shared_array(shape):
+    raw = multiprocessing.RawArray('d', max(int(np.prod(shape)), 1))
+    return np.frombuffer(raw, dtype=np.float64)[:int(np.prod(shape))].reshape(
+        shape)
+
+
+def solve_block(side, start, end):
+    """
+    Шаг ALS для строк [start, end) одной стороны при фиксированных факторах
+    другой: для каждой строки решается (VᵀV + λ·n·I)·x = Vᵀr по её n оценкам.
+    Строки группируются по числу оценок с точностью до степени двойки,
+    оценки группы дополняются нулями до общей длины, и VᵀV всей группы
+    считается одним пакетным умножением матриц.
+    """
+    ratings = _shared['ratings'][side]
+    other = _shared['factors'][OTHER_SIDE[side]]
+    rank = other.shape[1]
+    counts = np.diff(ratings.ptr[start:end + 1])
+    result = np.zeros((end - start, rank))
+    present = np.flatnonzero(counts)
+    buckets = np.ceil(np.log2(counts[present])).astype(np.int64)
+    for bucket in np.unique(buckets):
+        rows = present[buckets == bucket]
+        width = counts[rows].max()
+        positions = ratings.ptr[start + rows, None] + np.arange(width)
+        mask = np.arange(width) < counts[rows, None]
+        positions = np.where(mask, positions, 0)
+        factors = other[ratings.cols[positions]] * mask[..., None]
+        values = ratings.values[positions] * mask
+        gram = factors.transpose(0, 2, 1) @ factors
+        gram += (
+            _shared['regularization']
+            * counts[rows, None, None] * np.eye(rank)
+        )
+        rhs = np.einsum('bdk,bd->bk', factors, values)
+        result[rows] = np.linalg.solve(gram, rhs[..., None])[..., 0]
+    _shared['factors'][side][start:end] = result
+
+
+def recommend_block(start, end):
+    """
+    Предсказывает оценки пользователей [start, end) по всем произведениям
+    и возвращает top-N неоценённых: (строки пользователей, столбцы
+    произведений, оценки).
+    """
+    ratings = _shared['ratings']['users']
+    titles = _shared['factors']['titles']
+    scores = _shared['factors']['users'][start:end] @ titles.T
+    low, high = ratings.ptr[start], ratings.ptr[end]
+    counts = np.diff(ratings.ptr[start:end + 1])
+    scores[np.repeat(np.arange(end - start), counts),
+           ratings.cols[low:high]] = -np.inf
+
+    top = min(_shared['top_n'], scores.shape[1])
+    best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    users = np.broadcast_to(np.arange(start, end)[:, None], best.shape)
+    keep = np.isfinite(best_scores) & (counts > 0)[:, None]
+    return users[keep], best[keep], best_scores[keep]
+
+
+class Factorization:
+    """
+    Разложение матрицы оценок пользователей на факторы методом ALS.
+    Блоки строк решаются в пуле процессов, если workers больше одного.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        self.pool = None
+
+    def __enter__(self):
+        if self.options['workers'] > 1:
+            # Соединения с базой не должны достаться дочерним процессам.
+            connections.close_all()
+            self.pool = multiprocessing.get_context('fork').Pool(
+                self.options['workers'])
+        return self
+
+    def __exit__(self, *args):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+    def run(self, function, tasks):
+        if self.pool is None:
+            return [function(*task) for task in tasks]
+        return self.pool.starmap(function, tasks)
+
+    def solve(self, side):
+        ratings = _shared['ratings'][side]
+        self.run(solve_block, [
+            (side, start, end)
+            for start, end in ratings.blocks(self.options['block_size'])
+        ])
+
+    def recommend(self):
+        users = _shared['ratings']['users'].size
+        titles = len(_shared['factors']['titles'])
+        step = max(RECOMMEND_BLOCK // max(titles, 1), 1)
+        parts = self.run(recommend_block, [
+            (start, min(start + step, users))
+            for start in range(0, users, step)
+        ])
+        if not parts:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+def prepare(user_ids, title_ids, scores, title_factors, options):
+    """
+    Заполняет _shared до создания пула процессов: оценки по пользователям
+    и разделяемые массивы факторов. Возвращает id пользователей
+    в порядке строк.
+    """
+    users, user_rows = np.unique(user_ids, return_inverse=True)
+    _shared['ratings'] = {
+        'users': Ratings(user_rows, title_ids, scores, len(users)),
+    }
+    _shared['factors'] = {
+        'users': shared_array((len(users), options['factors'])),
+        'titles': shared_array(title_factors.shape),
+    }
+    _shared['factors']['titles'][:] = title_factors
+    _shared['regularization'] = options['regularization']
+    _shared['top_n'] = options['top_n']
+    return users
+
+
+def review_states(queryset):
+    return {
+        author: (count, last)
+        for author, count, last in queryset.order_by().values(
+            'author').annotate(
+            count=Count('id'), last=Max('updated_at')).values_list(
+            'author', 'count', 'last')
+    }
+
+
+def factors_to_bytes(factors):
+    return [row.astype(np.float32).tobytes() for row in factors]
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит персональные рекомендации: разложение матрицы оценок '
+        'методом ALS и top-N произведений с лучшей предсказанной оценкой'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Пересчитать только пользователей, чьи отзывы изменились, '
+                 'по сохранённым факторам произведений')
+        parser.add_argument(
+            '--factors', type=int, default=32,
+            help='Число скрытых факторов')
+        parser.add_argument(
+            '--iterations', type=int, default=10,
+            help='Число итераций ALS')
+        parser.add_argument(
+            '--regularization', type=float, default=0.1,
+            help='Коэффициент регуляризации на одну оценку')
+        parser.add_argument(
+            '--top-n', type=int, default=20,
+            help='Сколько рекомендаций хранить для пользователя')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число процессов для расчёта')
+        parser.add_argument(
+            '--block-size', type=int, default=100_000,
+            help='Сколько оценок обрабатывать в одном блоке')
+        parser.add_argument(
+            '--chunk-size', type=int, default=100_000,
+            help='Сколько строк читать из базы за раз')
+        parser.add_argument(
+            '--batch-size', type=int, default=10_000,
+            help='Сколько строк записывать за раз')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел')
+        parser.add_argument(
+            '--synthetic', type=int, metavar='REVIEWS',
+            help='Не трогать базу, а замерить расчёт на случайных данных '
+                 'с указанным числом отзывов')
+        parser.add_argument(
+            '--synthetic-titles', type=int, default=10_000,
+            help='Число произведений для --synthetic')
+        parser.add_argument(
+            '--synthetic-users', type=int, default=100_000,
+            help='Число пользователей для --synthetic')
+
+    def handle(self, *args, **options):
+        for name in (
+            'factors', 'iterations', 'top_n', 'workers', 'block_size'
+        ):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} должен быть больше нуля')
+        if options['regularization'] <= 0:
+            raise CommandError('--regularization должен быть больше нуля')
+
+        started = time.perf_counter()
+        if options['synthetic']:
+            self.benchmark(options)
+        elif options['incremental']:
+            self.refresh(options)
+        else:
+            self.rebuild(options)
+        _shared.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - started:.2f} с'))
+
+    def factorize(self, user_ids, title_ids, scores, options):
+        rng = np.random.default_rng(options['seed'])
+        titles, title_rows = np.unique(title_ids, return_inverse=True)
+        users = prepare(
+            user_ids, title_rows, scores,
+            rng.normal(0, 0.1, (len(titles), options['factors'])), options)
+        user_rows = np.searchsorted(users, user_ids)
+        _shared['ratings']['titles'] = Ratings(
+            title_rows, user_rows, scores, len(titles))
+
+        with Factorization(options) as factorization:
+            for _ in range(options['iterations']):
+                factorization.solve('users')
+                factorization.solve('titles')
+            recommended = factorization.recommend()
+        return users, titles, recommended
+
+    def rebuild(self, options):
+        states = review_states(Review.objects.visible())
+        data = load_columns(
+            Review.objects.visible().order_by().values_list(
+                'author_id', 'title_id', 'score'),
+            options['chunk_size'])
+        users, titles, (rows, cols, scores) = self.factorize(
+            data[:, 0], data[:, 1], data[:, 2], options)
+
+        with transaction.atomic():
+            Recommendation.objects.all().delete()
+            RecommendationState.objects.all().delete()
+            TitleFactors.objects.all().delete()
+            insert_rows(
+                TitleFactors, ('title_id', 'factors'),
+                zip(titles.tolist(),
+                    factors_to_bytes(_shared['factors']['titles'])),
+                options['batch_size'])
+            self.save(users, titles, rows, cols, scores, states, options)
+        self.stdout.write(
+            f'Отзывов: {len(data)}, пользователей: {len(users)}, '
+            f'произведений: {len(titles)}')
+
+    def refresh(self, options):
+        """
+        Пересчёт пользователей, у которых число отзывов или время
+        последнего изменения отзыва не совпадает с сохранённым. Факторы
+        произведений не меняются, вектор пользователя получается одним
+        шагом ALS по его текущим оценкам.
+        """
+        stored = list(TitleFactors.objects.order_by('title').values_list(
+            'title_id', 'factors'))
+        if not stored:
+            raise CommandError(
+                'Факторов произведений нет, сначала выполните полный расчёт')
+        titles = np.array([title_id for title_id, _ in stored])
+        title_factors = np.stack([
+            np.frombuffer(factors, dtype=np.float32) for _, factors in stored
+        ]).astype(np.float64)
+        options['factors'] = title_factors.shape[1]
+
+        states = review_states(Review.objects.visible())
+        saved = {
+            user: (count, last)
+            for user, count, last in RecommendationState.objects.values_list(
+                'user', 'reviews_count', 'last_review_at')
+        }
+        changed = [user for user, state in states.items()
+                   if saved.get(user) != state]
+        removed = [user for user in saved if user not in states]
+
+        chunks = [
+            load_columns(
+                Review.objects.visible().filter(
+                    author__in=changed[start:start + ID_BATCH]
+                ).order_by().values_list('author_id', 'title_id', 'score'),
+                options['chunk_size'])
+            for start in range(0, len(changed), ID_BATCH)
+        ]
+        data = np.concatenate(chunks) if chunks else np.empty(
+            (0, 3), dtype=np.int64)
+        # Оценки произведений, появившихся после полного расчёта, не
+        # участвуют: у этих произведений ещё нет факторов.
+        data = data[np.isin(data[:, 1], titles)]
+
+        users = prepare(
+            data[:, 0], np.searchsorted(titles, data[:, 1]), data[:, 2],
+            title_factors, options)
+        with Factorization(options) as factorization:
+            factorization.solve('users')
+            rows, cols, scores = factorization.recommend()
+
+        with transaction.atomic():
+            stale = changed + removed
+            for start in range(0, len(stale), ID_BATCH):
+                batch = stale[start:start + ID_BATCH]
+                Recommendation.objects.filter(user__in=batch).delete()
+                RecommendationState.objects.filter(user__in=batch).delete()
+            self.save(users, titles, rows, cols, scores, {
+                user: states[user] for user in changed}, options)
+        self.stdout.write(
+            f'Пересчитано пользователей: {len(changed)}, '
+            f'удалено: {len(removed)}')
+
+    def save(self, users, titles, rows, cols, scores, states, options):
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        insert_rows(
+            Recommendation, ('user_id', 'title_id', 'score'),
+            zip(users[rows].tolist(), titles[cols].tolist(),
+                scores.tolist()),
+            options['batch_size'])
+        insert_rows(
+            RecommendationState,
+            ('user_id', 'reviews_count', 'last_review_at'),
+            (
+                (user, count, adapt_datetime(last))
+                for user, (count, last) in states.items()
+            ),
+            options['batch_size'])
+
+    def benchmark(self, options):
+        rng = np.random.default_rng(options['seed'])
+        size = options['synthetic']
+        users = options['synthetic_users']
+        keys = np.unique(
+            rng.integers(0, options['synthetic_titles'], size=size) * users
+            + rng.integers(0, users, size=size))
+        title_ids, user_ids = keys // users, keys % users
+        scores = rng.integers(1, 11, size=len(keys))
+
+        started = time.perf_counter()
+        _, _, (rows, _, _) = self.factorize(
+            user_ids, title_ids, scores, options)
+        self.stdout.write(
+            f'Синтетические данные: {len(keys)} отзывов, '
+            f'рекомендаций: {len(rows)}, '
+            f'расчёт {time.perf_counter() - started:.2f} с')
@@ -0,0 +1,199 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.arrays import insert_rows, load_columns
+from reviews.models import Review, SimilarTitle
+
+
+class RatingMatrix:
+    """
+    Разреженная матрица оценок (произведения × пользователи) в двух
+    представлениях CSR: строки по произведениям и строки по пользователям.
+    Плотная матрица не строится ни на каком шаге.
+    """
+
+    def __init__(self, title_ids, user_ids, scores):
+        self.titles, rows = np.unique(title_ids, return_inverse=True)
+        _, cols = np.unique(user_ids, return_inverse=True)
+        values = scores.astype(np.float64)
+        self.size = len(self.titles)
+
+        order = np.argsort(rows, kind='stable')
+        self.title_ptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(rows, minlength=self.size))))
+        self.title_users = cols[order]
+        self.title_values = values[order]
+
+        order = np.argsort(cols, kind='stable')
+        self.user_degree = np.bincount(cols)
+        self.user_ptr = np.concatenate(([0], np.cumsum(self.user_degree)))
+        self.user_titles = rows[order]
+        self.user_values = values[order]
+
+        self.norms = np.sqrt(
+            np.bincount(rows, weights=values ** 2, minlength=self.size))
+        # Сколько пар (произведение, соседнее произведение) даёт каждая
+        # оценка и все оценки до начала каждой строки.
+        pairs = np.concatenate(
+            ([0], np.cumsum(self.user_degree[self.title_users])))
+        self.row_pairs = pairs[self.title_ptr]
+
+    def blocks(self, max_pairs):
+        """
+        Делит строки на блоки, в каждом из которых не больше max_pairs
+        промежуточных пар, — от этого зависит пиковая память.
+        """
+        start = 0
+        while start < self.size:
+            limit = self.row_pairs[start] + max_pairs
+            end = np.searchsorted(self.row_pairs, limit, side='right') - 1
+            end = min(max(end, start + 1), self.size)
+            yield start, end
+            start = end
+
+    def similar_block(self, start, end, top_k, min_support):
+        """
+        Строки X·Xᵀ для произведений [start, end), нормированные
+        до косинуса. Для каждой оценки блока перебираются все оценки того же
+        пользователя, произведения складываются по парам (строка, столбец).
+        Возвращает top_k соседей каждой строки.
+        """
+        low, high = self.title_ptr[start], self.title_ptr[end]
+        rows = np.repeat(
+            np.arange(start, end), np.diff(self.title_ptr[start:end + 1]))
+        users = self.title_users[low:high]
+        counts = self.user_degree[users]
+        offsets = np.repeat(
+            self.user_ptr[users] - np.cumsum(counts) + counts, counts
+        ) + np.arange(counts.sum())
+
+        pair_rows = np.repeat(rows, counts)
+        pair_cols = self.user_titles[offsets]
+        products = (
+            np.repeat(self.title_values[low:high], counts)
+            * self.user_values[offsets]
+        )
+        other = pair_rows != pair_cols
+        keys, inverse, support = np.unique(
+            pair_rows[other] * self.size + pair_cols[other],
+            return_inverse=True, return_counts=True)
+        dots = np.bincount(inverse, weights=products[other])
+
+        keep = support >= min_support
+        keys, dots = keys[keep], dots[keep]
+        rows, cols = keys // self.size, keys % self.size
+        scores = dots / (self.norms[rows] * self.norms[cols])
+
+        order = np.lexsort((cols, -scores, rows))
+        rows, cols, scores = rows[order], cols[order], scores[order]
+        first = np.searchsorted(rows, rows)
+        top = np.arange(len(rows)) - first < top_k
+        return (
+            self.titles[rows[top]],
+            self.titles[cols[top]],
+            scores[top],
+        )
+
+    def similar(self, top_k, min_support, max_pairs):
+        parts = [
+            self.similar_block(start, end, top_k, min_support)
+            for start, end in self.blocks(max_pairs)
+        ]
+        if not parts:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие произведения: косинусное сходство '
+        'произведений по оценкам пользователей, top-K соседей каждого'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=20,
+            help='Сколько похожих произведений хранить для каждого')
+        parser.add_argument(
+            '--min-support', type=int, default=2,
+            help='Сколько пользователей должны оценить оба произведения')
+        parser.add_argument(
+            '--max-pairs', type=int, default=2_000_000,
+            help='Сколько пар произведений обрабатывать за один блок')
+        parser.add_argument(
+            '--chunk-size', type=int, default=100_000,
+            help='Сколько строк читать из базы за раз')
+        parser.add_argument(
+            '--batch-size', type=int, default=10_000,
+            help='Сколько строк записывать за раз')
+        parser.add_argument(
+            '--synthetic', type=int, metavar='REVIEWS',
+            help='Не трогать базу, а замерить расчёт на случайных данных '
+                 'с указанным числом отзывов')
+        parser.add_argument(
+            '--synthetic-titles', type=int, default=10_000,
+            help='Число произведений для --synthetic')
+        parser.add_argument(
+            '--synthetic-users', type=int, default=100_000,
+            help='Число пользователей для --synthetic')
+
+    def handle(self, *args, **options):
+        for name in ('top_k', 'min_support', 'max_pairs'):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} должен быть больше нуля')
+
+        if options['synthetic']:
+            return self.benchmark(options)
+
+        started = time.perf_counter()
+        data = load_columns(
+            Review.objects.visible().order_by().values_list(
+                'title_id', 'author_id', 'score'),
+            options['chunk_size'])
+        loaded = time.perf_counter()
+
+        titles, similar, scores = RatingMatrix(
+            data[:, 0], data[:, 1], data[:, 2]
+        ).similar(
+            options['top_k'], options['min_support'], options['max_pairs'])
+        computed = time.perf_counter()
+
+        with transaction.atomic():
+            SimilarTitle.objects.all().delete()
+            insert_rows(
+                SimilarTitle, ('title_id', 'similar_id', 'score'),
+                zip(titles.tolist(), similar.tolist(), scores.tolist()),
+                options['batch_size'])
+        saved = time.perf_counter()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Сохранено пар: {len(titles)}, отзывов: {len(data)}. '
+            f'Чтение {loaded - started:.2f} с, '
+            f'расчёт {computed - loaded:.2f} с, '
+            f'запись {saved - computed:.2f} с'
+        ))
+
+    def benchmark(self, options):
+        rng = np.random.default_rng(0)
+        size = options['synthetic']
+        # Популярность произведений по закону Ципфа, как у реальных оценок.
+        title_ids = rng.zipf(1.5, size=size) % options['synthetic_titles']
+        user_ids = rng.integers(0, options['synthetic_users'], size=size)
+        keys = np.unique(title_ids * options['synthetic_users'] + user_ids)
+        title_ids = keys // options['synthetic_users']
+        user_ids = keys % options['synthetic_users']
+        scores = rng.integers(1, 11, size=len(keys))
+
+        started = time.perf_counter()
+        titles, _, _ = RatingMatrix(title_ids, user_ids, scores).similar(
+            options['top_k'], options['min_support'], options['max_pairs'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Синтетические данные: {len(keys)} отзывов, '
+            f'пар сохранено бы: {len(titles)}, расчёт {elapsed:.3f} с'
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews.models import Comment, Review
+from reviews.search import rebuild_text_index, rebuild_title_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает полнотекстовые индексы произведений, отзывов '
+        'и комментариев'
+    )
+
+    def handle(self, *args, **options):
+        # В транзакции читатели видят старые индексы до конца перестройки.
+        with transaction.atomic():
+            rebuild_title_index()
+            rebuild_text_index(Review)
+            rebuild_text_index(Comment)
+        self.stdout.write(self.style.SUCCESS('Поисковые индексы перестроены'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from reviews.models import Comment, Review
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики комментариев отзывов по одному '
+        'сгруппированному запросу и исправляет расхождения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько отзывов обновлять за раз')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            counts = dict(Comment.objects.visible().order_by().values_list(
+                'review').annotate(count=Count('id')))
+            stale = [
+                pk
+                for pk, stored in Review.objects.order_by().values_list(
+                    'pk', 'comments_count').iterator()
+                if stored != counts.get(pk, 0)
+            ]
+            # Исправленные отзывы и их произведения отмечаются изменёнными,
+            # иначе ETag отзыва и списка отзывов остались бы прежними.
+            batch_size = options['batch_size']
+            for start in range(0, len(stale), batch_size):
+                Review.objects.filter(
+                    pk__in=stale[start:start + batch_size]
+                ).refresh_comments_count()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: {len(stale)}'))
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:53
+
+from django.db import migrations, models
+
+
+def fill_search_names(apps, schema_editor):
+    for model_name in ('Category', 'Genre', 'Title'):
+        model = apps.get_model('reviews', model_name)
+        objects = list(model.objects.only('id', 'name'))
+        for obj in objects:
+            obj.search_name = (
+                ' '.join(obj.name.split()).casefold().replace('ё', 'е'))
+        model.objects.bulk_update(objects, ['search_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_genre_rankings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    GenreRanking = apps.get_model('reviews', 'GenreRanking')
+    links = Title.genre.through.objects.values_list(
+        'title_id', 'genre_id', 'title__rating')
+    GenreRanking.objects.bulk_create(
+        (
+            GenreRanking(title_id=title_id, genre_id=genre_id, rating=rating)
+            for title_id, genre_id, rating in links.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_search_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenreRanking',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.FloatField(null=True, verbose_name='Рейтинг')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг в жанре',
+                'verbose_name_plural': 'Рейтинги в жанрах',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-rating', 'id'], name='title_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-rating', 'id'], name='title_category_rating_idx'),
+        ),
+        migrations.AddField(
+            model_name='genreranking',
+            name='genre',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='reviews.Genre', verbose_name='Жанр'),
+        ),
+        migrations.AddField(
+            model_name='genreranking',
+            name='title',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_rankings', to='reviews.Title', verbose_name='Произведение'),
+        ),
+        migrations.AddIndex(
+            model_name='genreranking',
+            index=models.Index(fields=['genre', '-rating', 'title'], name='genre_ranking_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='genreranking',
+            constraint=models.UniqueConstraint(fields=('genre', 'title'), name='unique_genre_ranking'),
+        ),
+        migrations.RunPython(fill_genre_rankings, migrations.RunPython.noop),
+    ]
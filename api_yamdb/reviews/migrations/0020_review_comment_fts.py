@@ -0,0 +1,37 @@
+from django.db import migrations
+
+FTS_TABLES = ('reviews_review', 'reviews_comment')
+
+
+def create_text_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for table in FTS_TABLES:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts '
+            "USING fts5(text, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {table}_fts (rowid, text) '
+            f'SELECT id, text FROM {table}'
+        )
+
+
+def drop_text_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for table in FTS_TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0019_moderation'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_text_fts, drop_text_fts),
+    ]
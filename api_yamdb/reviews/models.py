@@ -1,20 +1,73 @@
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Avg, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 import datetime as dt
 
+from .search import normalize_search_key
+
 User = get_user_model()
 
 CHOICES = zip(range(1, 11), range(1, 11))
 
+# Сколько жанров помещается в Title.genre_mask: знаковый бит BigInteger
+# не используется. Жанры сверх лимита фильтруются через таблицу связей.
+GENRE_MASK_BITS = 63
+
 
 def validate_year(value):
     if value > dt.datetime.now().year:
         raise ValidationError(f'Указанный год больше нынешнего: {value}')
 
 
-class Category(models.Model):
+class SearchNameModel(models.Model):
+    """
+    Добавляет индексированное поле search_name с нормализованным name.
+    """
+    search_name = models.CharField(
+        max_length=256, default='', editable=False, db_index=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_search_key(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        super().save(*args, **kwargs)
+
+
+class DenormalizedModel(models.Model):
+    """
+    Поля из denormalized_fields пересчитываются отдельными UPDATE.
+    save() существующей записи без update_fields их не пишет: иначе
+    значения, загруженные в начале запроса, затёрли бы изменения,
+    сделанные параллельно.
+    """
+    denormalized_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.denormalized_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Category(SearchNameModel):
     name = models.CharField(max_length=256, verbose_name='Название')
     slug = models.SlugField(max_length=50, unique=True)
 
@@ -27,9 +80,12 @@ class Category(models.Model):
         return self.name
 
 
-class Genre(models.Model):
+class Genre(SearchNameModel):
     name = models.CharField(max_length=256, verbose_name='Название')
     slug = models.SlugField(max_length=50, unique=True)
+    bit = models.PositiveSmallIntegerField(
+        null=True, unique=True, editable=False,
+        verbose_name='Бит в маске жанров')
 
     class Meta:
         ordering = ['id']
@@ -39,8 +95,83 @@ class Genre(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.pk is not None or self.bit is not None:
+            return super().save(*args, **kwargs)
 
-class Title(models.Model):
+        # Параллельно создаваемый жанр может выбрать тот же свободный бит:
+        # вставку отсекает уникальность bit, и бит выбирается заново.
+        # Когда биты кончаются, free_bit возвращает None и цикл завершается.
+        while True:
+            self.bit = self.free_bit()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if self.bit is None or not Genre.objects.filter(
+                        bit=self.bit).exists():
+                    raise
+
+    @classmethod
+    def free_bit(cls):
+        used = set(cls.objects.filter(
+            bit__isnull=False).values_list('bit', flat=True))
+        return next(
+            (bit for bit in range(GENRE_MASK_BITS) if bit not in used), None)
+
+
+class TitleQuerySet(models.QuerySet):
+
+    def refresh_ratings(self):
+        """
+        Пересчитывает rating и reviews_count выбранных произведений
+        одним UPDATE с подзапросами по отзывам каждого произведения
+        и отмечает их изменёнными.
+        """
+        reviews = Review.objects.visible().filter(
+            title=OuterRef('pk')).order_by().values('title')
+        updated = self.update(
+            rating=Subquery(
+                reviews.annotate(avg=Avg('score')).values('avg')),
+            reviews_count=Coalesce(Subquery(
+                reviews.annotate(count=Count('id')).values('count')), 0),
+            updated_at=timezone.now(),
+        )
+        GenreRanking.objects.filter(title__in=self).update(
+            rating=Subquery(Title.objects.filter(
+                pk=OuterRef('title_id')).values('rating')[:1]))
+        return updated
+
+    def sync_genres(self):
+        """
+        Пересобирает genre_mask и строки GenreRanking выбранных
+        произведений по их текущим жанрам.
+        """
+        ratings = dict(self.values_list('pk', 'rating'))
+        links = list(Title.genre.through.objects.filter(
+            title_id__in=ratings).values_list(
+                'title_id', 'genre_id', 'genre__bit'))
+
+        masks = dict.fromkeys(ratings, 0)
+        for title_id, genre_id, bit in links:
+            if bit is not None:
+                masks[title_id] |= 1 << bit
+        titles_by_mask = {}
+        for title_id, mask in masks.items():
+            titles_by_mask.setdefault(mask, []).append(title_id)
+        for mask, title_ids in titles_by_mask.items():
+            Title.objects.filter(pk__in=title_ids).update(genre_mask=mask)
+
+        GenreRanking.objects.filter(title_id__in=ratings).delete()
+        GenreRanking.objects.bulk_create(
+            GenreRanking(
+                title_id=title_id, genre_id=genre_id,
+                rating=ratings[title_id])
+            for title_id, genre_id, _ in links
+        )
+
+
+class Title(DenormalizedModel, SearchNameModel):
     name = models.CharField(max_length=256, verbose_name='Название')
     year = models.PositiveSmallIntegerField(
         validators=(validate_year,), verbose_name='Год')
@@ -50,22 +181,217 @@ class Title(models.Model):
         related_name='categories', verbose_name='Категория')
     genre = models.ManyToManyField(
         Genre, related_name='genre', verbose_name='Жанр')
+    rating = models.FloatField(
+        null=True, blank=True, editable=False, verbose_name='Рейтинг')
+    reviews_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество отзывов')
+    weighted_rating = models.FloatField(
+        null=True, blank=True, editable=False,
+        verbose_name='Взвешенный рейтинг')
+    # Побитовое ИЛИ Genre.bit жанров произведения.
+    genre_mask = models.BigIntegerField(
+        default=0, editable=False, verbose_name='Маска жанров')
+    # Меняется и при изменении отзывов произведения.
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения')
+
+    objects = TitleQuerySet.as_manager()
+
+    denormalized_fields = (
+        'rating', 'reviews_count', 'weighted_rating', 'genre_mask')
 
     class Meta:
         ordering = ['id']
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(fields=['year', 'id'], name='title_year_id_idx'),
+            models.Index(
+                fields=['-rating', 'id'], name='title_rating_idx'),
+            models.Index(
+                fields=['category', '-rating', 'id'],
+                name='title_category_rating_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Review(models.Model):
+class GenreRanking(models.Model):
+    """
+    Копия рейтинга произведения для каждого его жанра: индекс
+    (genre, -rating) отдаёт лучшие произведения жанра без сортировки.
+    """
+    genre = models.ForeignKey(
+        Genre, on_delete=models.CASCADE,
+        related_name='rankings', verbose_name='Жанр')
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE,
+        related_name='genre_rankings', verbose_name='Произведение')
+    rating = models.FloatField(null=True, verbose_name='Рейтинг')
+
+    class Meta:
+        verbose_name = 'Рейтинг в жанре'
+        verbose_name_plural = 'Рейтинги в жанрах'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['genre', 'title'],
+                name='unique_genre_ranking'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['genre', '-rating', 'title'],
+                name='genre_ranking_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.genre}: {self.title}'
+
+
+class SimilarTitle(models.Model):
+    """
+    Ближайшие соседи произведения по оценкам пользователей. Таблица
+    целиком пересчитывается командой build_similar_titles.
+    """
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE,
+        related_name='similar_titles', verbose_name='Произведение')
+    similar = models.ForeignKey(
+        Title, on_delete=models.CASCADE,
+        related_name='+', verbose_name='Похожее произведение')
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'similar'],
+                name='unique_similar_title'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['title', '-score', 'similar'],
+                name='similar_title_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.title} ~ {self.similar}'
+
+
+class TitleFactors(models.Model):
+    """
+    Вектор скрытых факторов произведения из разложения матрицы оценок.
+    Нужен для пересчёта рекомендаций отдельных пользователей.
+    """
+    title = models.OneToOneField(
+        Title, on_delete=models.CASCADE, primary_key=True,
+        related_name='factors', verbose_name='Произведение')
+    factors = models.BinaryField(verbose_name='Факторы')
+
+    class Meta:
+        verbose_name = 'Факторы произведения'
+        verbose_name_plural = 'Факторы произведений'
+
+    def __str__(self):
+        return str(self.title)
+
+
+class Recommendation(models.Model):
+    """
+    Готовая рекомендация пользователю с предсказанной оценкой.
+    Строится командой build_recommendations.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='recommendations', verbose_name='Пользователь')
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE,
+        related_name='recommendations', verbose_name='Произведение')
+    score = models.FloatField(verbose_name='Предсказанная оценка')
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'title'],
+                name='unique_recommendation'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score', 'title'],
+                name='recommendation_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.title}'
+
+
+class RecommendationState(models.Model):
+    """
+    По каким отзывам построены рекомендации пользователя. Расхождение
+    с текущими отзывами означает, что рекомендации пора пересчитать.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='recommendation_state', verbose_name='Пользователь')
+    reviews_count = models.IntegerField(verbose_name='Число отзывов')
+    last_review_at = models.DateTimeField(
+        verbose_name='Последнее изменение отзывов')
+
+    class Meta:
+        verbose_name = 'Состояние рекомендаций'
+        verbose_name_plural = 'Состояния рекомендаций'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class VisibleQuerySet(models.QuerySet):
+
+    def visible(self):
+        """
+        Без скрытых модератором записей.
+        """
+        return self.filter(is_hidden=False)
+
+
+class ReviewQuerySet(VisibleQuerySet):
+
+    def refresh_comments_count(self):
+        """
+        Пересчитывает comments_count выбранных отзывов по видимым
+        комментариям одним UPDATE и отмечает изменёнными отзывы и их
+        произведения: счётчик входит в список отзывов произведения.
+        """
+        now = timezone.now()
+        comments = Comment.objects.visible().filter(
+            review=OuterRef('pk')).order_by().values('review')
+        Title.objects.filter(
+            pk__in=self.order_by().values('title')).update(updated_at=now)
+        return self.update(
+            comments_count=Coalesce(Subquery(
+                comments.annotate(count=Count('id')).values('count')), 0),
+            updated_at=now,
+        )
+
+
+class Review(DenormalizedModel):
     text = models.TextField(verbose_name='Текст')
     score = models.IntegerField(
         choices=CHOICES, default=1, verbose_name='Оценка')
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации', auto_now_add=True)
+    # Меняется и при изменении комментариев к отзыву.
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения')
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество комментариев')
+    is_hidden = models.BooleanField(default=False, verbose_name='Скрыт')
     title = models.ForeignKey(
         Title, on_delete=models.CASCADE,
         related_name='reviews', verbose_name='Произведение')
@@ -73,6 +399,10 @@ class Review(models.Model):
         User, on_delete=models.CASCADE,
         related_name='reviews', verbose_name='Автор')
 
+    objects = ReviewQuerySet.as_manager()
+
+    denormalized_fields = ('comments_count', 'is_hidden')
+
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Отзыв'
@@ -83,14 +413,22 @@ class Review(models.Model):
                 name='unique_name_reviews'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date'], name='review_title_date_idx'),
+            models.Index(
+                fields=['title', 'score'], name='review_title_score_idx'),
+        ]
 
     def __str__(self):
         return self.text
 
 
-class Comment(models.Model):
+class Comment(DenormalizedModel):
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения')
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='comments',
         verbose_name='Автор')
@@ -98,11 +436,21 @@ class Comment(models.Model):
         Review, on_delete=models.CASCADE,
         related_name='comments', verbose_name='Обзор')
     text = models.TextField(verbose_name='Текст')
+    is_hidden = models.BooleanField(default=False, verbose_name='Скрыт')
+
+    objects = VisibleQuerySet.as_manager()
+
+    denormalized_fields = ('is_hidden',)
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date'],
+                name='comment_review_date_idx'),
+        ]
 
     def __str__(self):
         return self.text
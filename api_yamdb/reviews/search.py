@@ -0,0 +1,222 @@
+"""
+Полнотекстовый поиск по произведениям, отзывам и комментариям
+на SQLite FTS5.
+
+Индекс модели хранится в виртуальной таблице <таблица модели>_fts,
+где rowid совпадает с id записи. Таблицы обновляются сигналами при записи
+моделей, поэтому переживают пересоздание основных таблиц миграциями.
+На других СУБД поиск сводится к icontains.
+"""
+import re
+from html import escape
+
+from django.db import connection
+from django.db.models import FloatField, TextField
+from django.db.models.expressions import RawSQL
+
+TITLE_FTS_TABLE = 'reviews_title_fts'
+FTS_TOKENIZE = "tokenize='unicode61 remove_diacritics 2'"
+
+CREATE_TITLE_FTS_SQL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TITLE_FTS_TABLE} '
+    f'USING fts5(name, description, {FTS_TOKENIZE})'
+)
+
+# Границы совпадений во фрагменте: управляющие символы не встречаются
+# в тексте после экранирования и заменяются на <mark> в highlight.
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+SNIPPET_TOKENS = 16
+
+# Сколько id удаляется из индекса одним DELETE ... IN: не больше
+# лимита параметров запроса старых сборок SQLite (999).
+UNINDEX_BATCH_SIZE = 900
+
+# Вес совпадения в названии выше, чем в описании.
+TITLE_RANK_SQL = f'bm25({TITLE_FTS_TABLE}, 10.0, 1.0)'
+
+
+def normalize_search_key(value):
+    """
+    Ключ для поиска по названию без учёта регистра: SQLite сравнивает
+    без учёта регистра только ASCII, поэтому ключ хранится готовым.
+    """
+    return ' '.join(value.split()).casefold().replace('ё', 'е')
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Превращает пользовательский ввод в безопасный запрос MATCH:
+    каждое слово ищется по префиксу, все слова обязательны.
+    """
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_title(title):
+    index_titles([title])
+
+
+def index_titles(titles):
+    if not fts_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TITLE_FTS_TABLE} WHERE rowid = %s',
+            [[title.pk] for title in titles],
+        )
+        cursor.executemany(
+            f'INSERT INTO {TITLE_FTS_TABLE} (rowid, name, description) '
+            'VALUES (%s, %s, %s)',
+            [[title.pk, title.name, title.description] for title in titles],
+        )
+
+
+def unindex_title(title_id):
+    if not fts_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TITLE_FTS_TABLE} WHERE rowid = %s', [title_id])
+
+
+def rebuild_title_index():
+    if not fts_available():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TITLE_FTS_SQL)
+        cursor.execute(f'DELETE FROM {TITLE_FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TITLE_FTS_TABLE} (rowid, name, description) '
+            'SELECT id, name, description FROM reviews_title'
+        )
+
+
+def search_titles(queryset, text):
+    """
+    Оставляет в queryset найденные произведения, отсортированные
+    по релевантности. Индекс FTS5 присоединяется к reviews_title, так что
+    стоимость запроса зависит от числа совпадений, а не от размера таблицы.
+    """
+    if not fts_available():
+        return queryset.filter(name__icontains=text)
+
+    query = build_match_query(text)
+    if not query:
+        return queryset.none()
+
+    return queryset.extra(
+        select={'search_rank': TITLE_RANK_SQL},
+        tables=[TITLE_FTS_TABLE],
+        where=[
+            f'{TITLE_FTS_TABLE}.rowid = reviews_title.id',
+            f'{TITLE_FTS_TABLE} MATCH %s',
+        ],
+        params=[query],
+    ).order_by('search_rank', 'id')
+
+
+def text_fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def create_text_fts_sql(model):
+    return (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {text_fts_table(model)} '
+        f'USING fts5(text, {FTS_TOKENIZE})'
+    )
+
+
+def index_texts(model, rows):
+    """
+    Записывает в индекс модели пары (id, текст).
+    """
+    if not fts_available():
+        return
+
+    table = text_fts_table(model)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {table} WHERE rowid = %s',
+            [[pk] for pk, _ in rows],
+        )
+        cursor.executemany(
+            f'INSERT INTO {table} (rowid, text) VALUES (%s, %s)', rows)
+
+
+def unindex_texts(model, ids):
+    if not fts_available() or not ids:
+        return
+
+    # Один DELETE на порцию id: executemany выполнял бы отдельный запрос
+    # на каждую каскадно удалённую запись.
+    table = text_fts_table(model)
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), UNINDEX_BATCH_SIZE):
+            batch = ids[start:start + UNINDEX_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f'DELETE FROM {table} WHERE rowid IN ({placeholders})',
+                batch)
+
+
+def rebuild_text_index(model):
+    if not fts_available():
+        return
+
+    table = text_fts_table(model)
+    with connection.cursor() as cursor:
+        cursor.execute(create_text_fts_sql(model))
+        cursor.execute(f'DELETE FROM {table}')
+        cursor.execute(
+            f'INSERT INTO {table} (rowid, text) '
+            f'SELECT id, text FROM {model._meta.db_table}'
+        )
+
+
+def search_texts(queryset, text):
+    """
+    Оставляет в queryset отзывы или комментарии, найденные по тексту,
+    по релевантности. Ранг и фрагмент с совпадениями добавляются
+    аннотациями search_rank и search_snippet: по search_rank, в отличие
+    от extra(select=...), можно фильтровать, и курсорная пагинация
+    работает и для результатов поиска.
+    """
+    if not fts_available():
+        return queryset.filter(text__icontains=text)
+
+    query = build_match_query(text)
+    if not query:
+        return queryset.none()
+
+    table = text_fts_table(queryset.model)
+    return queryset.annotate(
+        search_rank=RawSQL(
+            f'bm25({table})', [], output_field=FloatField()),
+        search_snippet=RawSQL(
+            f"snippet({table}, 0, %s, %s, '…', {SNIPPET_TOKENS})",
+            [SNIPPET_START, SNIPPET_END], output_field=TextField()),
+    ).extra(
+        tables=[table],
+        where=[
+            f'{table}.rowid = {queryset.model._meta.db_table}.id',
+            f'{table} MATCH %s',
+        ],
+        params=[query],
+    ).order_by('search_rank', 'pk')
+
+
+def highlight(snippet):
+    """
+    Фрагмент для ответа API: текст экранирован, совпадения в <mark>.
+    """
+    return escape(snippet).replace(
+        SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
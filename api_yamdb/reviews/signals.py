@@ -0,0 +1,134 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Comment, Genre, Review, Title
+from .search import index_texts, index_title, unindex_texts, unindex_title
+
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_updates():
+    """
+    Внутри блока сигналы отзывов и комментариев не пересчитывают рейтинги
+    и счётчики и не чистят поисковый индекс по каждой строке, а запоминают
+    id. При выходе каждое произведение и отзыв пересчитываются один раз,
+    удалённые записи убираются из индекса одним запросом на модель. Блок
+    должен быть внутри транзакции, которой принадлежат изменения.
+    """
+    pending = {
+        'titles': set(),
+        'reviews': set(),
+        'unindexed': {Review: set(), Comment: set()},
+    }
+    _deferred.pending = pending
+    try:
+        yield pending
+    finally:
+        del _deferred.pending
+    Title.objects.filter(pk__in=pending['titles']).refresh_ratings()
+    Review.objects.filter(
+        pk__in=pending['reviews']).refresh_comments_count()
+    for model, ids in pending['unindexed'].items():
+        unindex_texts(model, ids)
+
+
+def get_pending():
+    return getattr(_deferred, 'pending', None)
+
+
+@receiver((post_save, post_delete), sender=Review)
+def refresh_title_rating(sender, instance, **kwargs):
+    pending = get_pending()
+    if pending is not None:
+        pending['titles'].add(instance.title_id)
+        return
+    Title.objects.filter(pk=instance.title_id).refresh_ratings()
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def touch_review(sender, instance, signal, created=False, **kwargs):
+    pending = get_pending()
+    if pending is not None:
+        pending['reviews'].add(instance.review_id)
+        return
+    # Счётчик меняется одним UPDATE с F(), поэтому параллельные
+    # комментарии не теряют приращения.
+    now = timezone.now()
+    changes = {'updated_at': now}
+    if signal is post_delete:
+        # Не ниже нуля: разошедшийся счётчик не должен нарушать CHECK
+        # положительного поля, его исправит repair_comment_counts.
+        if not instance.is_hidden:
+            changes['comments_count'] = Greatest(
+                F('comments_count') - 1, 0)
+    elif created:
+        changes['comments_count'] = F('comments_count') + 1
+    Review.objects.filter(pk=instance.review_id).update(**changes)
+    if 'comments_count' in changes:
+        # comments_count есть в списке отзывов, а его Last-Modified
+        # и ETag берутся из произведения.
+        Title.objects.filter(reviews=instance.review_id).update(
+            updated_at=now)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def update_text_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        index_texts(sender, [(instance.pk, instance.text)])
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def remove_text_search_index(sender, instance, **kwargs):
+    pending = get_pending()
+    if pending is not None:
+        pending['unindexed'][sender].add(instance.pk)
+        return
+    unindex_texts(sender, [instance.pk])
+
+
+@receiver(pre_delete, sender=Genre)
+def detach_genre_titles(sender, instance, **kwargs):
+    # Связи удалятся каскадом без m2m_changed, поэтому бит жанра
+    # снимается с произведений здесь.
+    changes = {'updated_at': timezone.now()}
+    if instance.bit is not None:
+        changes['genre_mask'] = F('genre_mask').bitand(~(1 << instance.bit))
+    Title.objects.filter(genre=instance).update(**changes)
+
+
+@receiver(post_save, sender=Title)
+def update_title_search_index(sender, instance, **kwargs):
+    index_title(instance)
+
+
+@receiver(post_delete, sender=Title)
+def remove_title_search_index(sender, instance, **kwargs):
+    unindex_title(instance.pk)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def sync_title_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        titles = Title.objects.filter(pk=instance.pk)
+    elif pk_set:
+        titles = Title.objects.filter(pk__in=pk_set)
+    else:
+        titles = Title.objects.filter(genre_rankings__genre=instance)
+    titles.sync_genres()
@@ -76,6 +76,20 @@ def create_titles(admin_client):
     return result, categories, genres
 
 
+def create_many_titles(admin_client, count=15):
+    from reviews.models import Category, Genre, Title
+
+    titles, categories, genres = create_titles(admin_client)
+    category = Category.objects.get(slug=categories[0]['slug'])
+    genre_list = list(Genre.objects.all())
+    for number in range(count):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=1990 + number,
+            category=category)
+        title.genre.set(genre_list)
+    return titles, categories, genres
+
+
 def create_reviews(admin_client, admin):
     def create_review(uclient, title_id, text, score):
         data = {'text': text, 'score': score}
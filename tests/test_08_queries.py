@@ -0,0 +1,131 @@
+import pytest
+
+from .common import auth_client, create_many_titles
+
+
+class Test08QueriesAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_list_queries(self, client, admin_client,
+                                    django_assert_max_num_queries):
+        create_many_titles(admin_client)
+        # count + произведения с категориями + жанры одним prefetch
+        with django_assert_max_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/titles/` '
+            'возвращается статус 200'
+        )
+        assert len(response.json()['results']) == 10, (
+            'Проверьте, что при GET запросе `/api/v1/titles/` '
+            'возвращается полная страница произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_detail_queries(self, client, admin_client,
+                                     django_assert_max_num_queries):
+        titles, _, _ = create_many_titles(admin_client)
+        # updated_at для ETag + произведение с категорией + жанры
+        with django_assert_max_num_queries(3):
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{titles_id}/` '
+            'возвращается статус 200'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url', ['/api/v1/genres/', '/api/v1/categories/'])
+    def test_03_catalogue_queries(self, client, admin_client, url,
+                                  django_assert_max_num_queries):
+        create_many_titles(admin_client)
+        with django_assert_max_num_queries(2):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что при GET запросе `{url}` возвращается статус 200'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_users_list_queries(self, admin_client, django_user_model,
+                                   django_assert_max_num_queries):
+        for number in range(15):
+            django_user_model.objects.create_user(
+                username=f'user{number}', email=f'user{number}@yamdb.fake')
+        # пользователь из токена + count + страница пользователей
+        with django_assert_max_num_queries(3):
+            response = admin_client.get('/api/v1/users/')
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/users/` '
+            'возвращается статус 200'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_reviews_list_queries(self, client, admin_client,
+                                     django_user_model,
+                                     django_assert_max_num_queries):
+        titles, _, _ = create_many_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        for number in range(15):
+            user = django_user_model.objects.create_user(
+                username=f'user{number}', email=f'user{number}@yamdb.fake')
+            auth_client(user).post(url, data={'text': 'Отзыв', 'score': 5})
+        # updated_at произведения + count + страница отзывов с авторами
+        with django_assert_max_num_queries(3):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе '
+            '`/api/v1/titles/{title_id}/reviews/` возвращается статус 200'
+        )
+        assert len(response.json()['results']) == 10
+
+        response = client.get('/api/v1/titles/100500/reviews/')
+        assert response.status_code == 404, (
+            'Проверьте, что для несуществующего произведения '
+            '`/api/v1/titles/{title_id}/reviews/` возвращает статус 404'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_comments_list_queries(self, client, admin_client,
+                                      django_user_model,
+                                      django_assert_max_num_queries):
+        titles, _, _ = create_many_titles(admin_client)
+        response = admin_client.post(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+            data={'text': 'Отзыв', 'score': 5})
+        review_id = response.json()['id']
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review_id}/comments/'
+        for number in range(15):
+            user = django_user_model.objects.create_user(
+                username=f'user{number}', email=f'user{number}@yamdb.fake')
+            auth_client(user).post(url, data={'text': 'Комментарий'})
+        # updated_at отзыва + count + страница комментариев с авторами
+        with django_assert_max_num_queries(3):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе '
+            '`/api/v1/titles/{title_id}/reviews/{review_id}/comments/` '
+            'возвращается статус 200'
+        )
+        assert len(response.json()['results']) == 10
+        # курсор: updated_at отзыва + страница комментариев с авторами
+        with django_assert_max_num_queries(2):
+            response = client.get(f'{url}?cursor=')
+        assert len(response.json()['results']) == 10
+
+        comment_id = response.json()['results'][0]['id']
+        with django_assert_max_num_queries(2):
+            response = client.get(f'{url}{comment_id}/')
+        assert response.status_code == 200
+
+        wrong_url = (
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/{review_id}/comments/')
+        assert client.get(wrong_url).status_code == 404, (
+            'Проверьте, что комментарии отзыва недоступны '
+            'по адресу другого произведения'
+        )
+        assert client.get(f'{wrong_url}{comment_id}/').status_code == 404
+        response = auth_client(user).post(
+            wrong_url, data={'text': 'Комментарий'})
+        assert response.status_code == 404, (
+            'Проверьте, что комментарий нельзя создать '
+            'по адресу другого произведения'
+        )
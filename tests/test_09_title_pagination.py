@@ -0,0 +1,80 @@
+import base64
+import json
+
+import pytest
+
+from .common import create_many_titles
+
+
+class Test09TitlePaginationAPI:
+
+    def walk_cursor(self, client, url):
+        ids = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200, (
+                f'Проверьте, что при GET запросе `{url}` '
+                'возвращается статус 200'
+            )
+            data = response.json()
+            assert 'next' in data and 'results' in data, (
+                'Проверьте, что в режиме курсора `/api/v1/titles/` '
+                'возвращает параметры `next` и `results`'
+            )
+            ids.extend(title['id'] for title in data['results'])
+            url = data['next']
+        return ids
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_cursor_walks_all_titles(self, client, admin_client):
+        from reviews.models import Title
+
+        create_many_titles(admin_client)
+        Title.objects.filter(year__lt=1995).update(year=1995)
+        expected = list(
+            Title.objects.order_by('year', 'id').values_list('id', flat=True))
+
+        ids = self.walk_cursor(client, '/api/v1/titles/?cursor=')
+        assert ids == expected, (
+            'Проверьте, что курсор `/api/v1/titles/?cursor=` обходит '
+            'все произведения в порядке (year, id) без пропусков и повторов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_cursor_keeps_filters(self, client, admin_client):
+        from reviews.models import Title
+
+        _, categories, _ = create_many_titles(admin_client)
+        slug = categories[0]['slug']
+        expected = list(
+            Title.objects.filter(category__slug=slug)
+            .order_by('year', 'id').values_list('id', flat=True))
+
+        ids = self.walk_cursor(
+            client, f'/api/v1/titles/?category={slug}&cursor=')
+        assert ids == expected, (
+            'Проверьте, что курсор `/api/v1/titles/` учитывает фильтры '
+            'на всех страницах'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_invalid_cursor(self, client, admin_client):
+        create_many_titles(admin_client)
+        response = client.get('/api/v1/titles/?cursor=broken')
+        assert response.status_code == 404, (
+            'Проверьте, что при неверном курсоре `/api/v1/titles/` '
+            'возвращает статус 404'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_cursor_value_types(self, client, admin_client):
+        create_many_titles(admin_client)
+        for position in (['abc', 1], [1995, 'x'], [None, 1], [[1], 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps({
+                'ordering': ['year', 'id'], 'position': position,
+            }).encode()).decode()
+            response = client.get(f'/api/v1/titles/?cursor={cursor}')
+            assert response.status_code == 404, (
+                'Проверьте, что курсор со значениями не того типа '
+                'возвращает статус 404'
+            )
@@ -0,0 +1,90 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test10TitleSearchAPI:
+
+    def search(self, client, text):
+        response = client.get('/api/v1/titles/', {'search': text})
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/titles/?search=` '
+            'возвращается статус 200'
+        )
+        return [title['name'] for title in response.json()['results']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search_name_and_description(self, client, admin_client):
+        create_titles(admin_client)
+        assert self.search(client, 'ПОВОРОТ') == ['Поворот туда'], (
+            'Проверьте, что поиск `/api/v1/titles/?search=` '
+            'находит произведение по названию без учёта регистра'
+        )
+        assert self.search(client, 'драм') == ['Проект'], (
+            'Проверьте, что поиск `/api/v1/titles/?search=` '
+            'находит произведение по началу слова в описании'
+        )
+        assert self.search(client, '"); DROP') == [], (
+            'Проверьте, что поиск `/api/v1/titles/?search=` '
+            'не падает на спецсимволах'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_search_ranking(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/',
+            data={'description': 'Проект века'})
+        assert self.search(client, 'проект') == ['Проект', 'Поворот туда'], (
+            'Проверьте, что поиск `/api/v1/titles/?search=` ставит '
+            'совпадения в названии выше совпадений в описании'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_search_index_follows_writes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Разворот'})
+        assert self.search(client, 'поворот') == [], (
+            'Проверьте, что после изменения названия старое название '
+            'больше не находится поиском'
+        )
+        assert self.search(client, 'разворот') == ['Разворот'], (
+            'Проверьте, что после изменения названия новое название '
+            'находится поиском'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        assert self.search(client, 'проект') == [], (
+            'Проверьте, что удалённое произведение не находится поиском'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_name_filter_ignores_case(self, client, admin_client):
+        create_titles(admin_client)
+        response = client.get('/api/v1/titles/', {'name': 'поворот'})
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Поворот туда'], (
+            'Проверьте, что фильтр `/api/v1/titles/?name=` '
+            'не учитывает регистр кириллицы'
+        )
+        response = client.get('/api/v1/titles/', {'name': 'ТУДА'})
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Поворот туда'], (
+            'Проверьте, что фильтр `/api/v1/titles/?name=` ищет '
+            'подстроку в любом месте названия'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url', ['/api/v1/genres/', '/api/v1/categories/'])
+    def test_05_catalogue_search_normalized(self, client, admin_client, url):
+        admin_client.post(url, data={'name': 'Ёлки Палки', 'slug': 'yolki'})
+        response = client.get(url, {'search': 'ЕЛКИ  палки'})
+        assert response.status_code == 200, (
+            f'Проверьте, что при GET запросе `{url}?search=` '
+            'возвращается статус 200'
+        )
+        slugs = [item['slug'] for item in response.json()['results']]
+        assert slugs == ['yolki'], (
+            f'Проверьте, что поиск `{url}?search=` не учитывает регистр '
+            'и разницу между `е` и `ё`'
+        )
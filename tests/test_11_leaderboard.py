@@ -0,0 +1,76 @@
+import pytest
+
+from .common import auth_client, create_reviews
+
+
+class Test11LeaderboardAPI:
+
+    def top(self, client, **params):
+        response = client.get('/api/v1/titles/top/', params)
+        assert response.status_code == 200, (
+            'Проверьте, что при GET запросе `/api/v1/titles/top/` '
+            'возвращается статус 200'
+        )
+        return [title['name'] for title in response.json()]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_top_titles(self, client, admin_client, admin):
+        _, titles, user, _ = create_reviews(admin_client, admin)
+        response = auth_client(user).post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/',
+            data={'text': 'Шедевр', 'score': 10})
+        review_id = response.json()['id']
+
+        assert self.top(client) == ['Проект', 'Поворот туда'], (
+            'Проверьте, что `/api/v1/titles/top/` возвращает произведения '
+            'по убыванию рейтинга'
+        )
+        assert self.top(client, limit=1) == ['Проект'], (
+            'Проверьте, что `/api/v1/titles/top/?limit=` '
+            'ограничивает размер списка'
+        )
+        assert self.top(client, category='films') == ['Поворот туда'], (
+            'Проверьте, что `/api/v1/titles/top/?category=` '
+            'возвращает лучшие произведения категории'
+        )
+        assert self.top(client, genre='drama') == ['Проект'], (
+            'Проверьте, что `/api/v1/titles/top/?genre=` '
+            'возвращает лучшие произведения жанра'
+        )
+
+        admin_client.delete(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/{review_id}/')
+        assert self.top(client) == ['Поворот туда'], (
+            'Проверьте, что `/api/v1/titles/top/` обновляется '
+            'после удаления отзыва и не содержит произведений без оценок'
+        )
+        assert self.top(client, genre='drama') == [], (
+            'Проверьте, что `/api/v1/titles/top/?genre=` обновляется '
+            'после удаления отзыва'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_top_follows_genre_changes(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        assert self.top(client, genre='horror') == ['Поворот туда'], (
+            'Проверьте, что `/api/v1/titles/top/?genre=` '
+            'возвращает лучшие произведения жанра'
+        )
+        admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/', data={'genre': ['drama']})
+        assert self.top(client, genre='horror') == [], (
+            'Проверьте, что `/api/v1/titles/top/?genre=` учитывает '
+            'изменение жанров произведения'
+        )
+        assert self.top(client, genre='drama') == ['Поворот туда'], (
+            'Проверьте, что `/api/v1/titles/top/?genre=` учитывает '
+            'изменение жанров произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_top_invalid_limit(self, client):
+        response = client.get('/api/v1/titles/top/', {'limit': 1000})
+        assert response.status_code == 400, (
+            'Проверьте, что при слишком большом `limit` '
+            '`/api/v1/titles/top/` возвращает статус 400'
+        )
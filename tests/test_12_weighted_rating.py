@@ -0,0 +1,51 @@
+import pytest
+from django.core.management import call_command
+
+from .common import auth_client, create_reviews
+
+
+class Test12WeightedRating:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_weighted_rating_command(self, client, admin_client, admin):
+        _, titles, user, _ = create_reviews(admin_client, admin)
+        auth_client(user).post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/',
+            data={'text': 'Шедевр', 'score': 10})
+
+        call_command('compute_weighted_ratings', '--min-votes', '2')
+
+        # средняя по сайту: (5 + 3 + 4 + 10) / 4 = 5.5
+        first = client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        second = client.get(f'/api/v1/titles/{titles[1]["id"]}/').json()
+        assert first['weighted_rating'] == pytest.approx(
+            (12 + 2 * 5.5) / (3 + 2)), (
+            'Проверьте, что `compute_weighted_ratings` считает байесовский '
+            'рейтинг произведения'
+        )
+        assert second['weighted_rating'] == pytest.approx(
+            (10 + 2 * 5.5) / (1 + 2)), (
+            'Проверьте, что `compute_weighted_ratings` считает байесовский '
+            'рейтинг произведения'
+        )
+        assert second['weighted_rating'] < second['rating'], (
+            'Проверьте, что единственная оценка тянется к средней по сайту'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_command_resets_response_cache(self, client, admin_client,
+                                              admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url).json()['weighted_rating'] is None
+        response = client.get('/api/v1/titles/')
+        assert response.json()['results'][0]['weighted_rating'] is None
+
+        call_command('compute_weighted_ratings')
+
+        assert client.get(url).json()['weighted_rating'] is not None
+        results = client.get('/api/v1/titles/').json()['results']
+        assert results[0]['weighted_rating'] is not None, (
+            'Проверьте, что после `compute_weighted_ratings` '
+            '`/api/v1/titles/` не отдаётся из устаревшего кэша'
+        )
@@ -0,0 +1,77 @@
+import pytest
+
+from .common import (
+    auth_client,
+    create_many_titles,
+    create_titles,
+    create_users_api,
+)
+
+
+class Test13ResponseCacheAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_served_from_cache(self, client, admin_client,
+                                         django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        first = client.get('/api/v1/titles/?year=2000&category=films')
+        client.get(url)
+        with django_assert_num_queries(0):
+            second = client.get('/api/v1/titles/?category=films&year=2000')
+        # из базы читается только updated_at для ETag
+        with django_assert_num_queries(1):
+            client.get(url)
+        assert first.json() == second.json(), (
+            'Проверьте, что повторный GET запрос `/api/v1/titles/` '
+            'отдаётся из кэша без обращения к базе'
+        )
+
+        admin_client.patch(url, data={'name': 'Новое имя'})
+        assert client.get(url).json()['name'] == 'Новое имя', (
+            'Проверьте, что после изменения произведения '
+            '`/api/v1/titles/{title_id}/` не отдаёт устаревшие данные'
+        )
+        response = client.get('/api/v1/titles/?year=2000&category=films')
+        assert response.json()['results'][0]['name'] == 'Новое имя', (
+            'Проверьте, что после изменения произведения '
+            '`/api/v1/titles/` не отдаёт устаревшие данные'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_review_invalidates_titles(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        user, _ = create_users_api(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url).json()['rating'] is None
+        auth_client(user).post(
+            f'{url}reviews/', data={'text': 'Хорошо', 'score': 8})
+        assert client.get(url).json()['rating'] == 8, (
+            'Проверьте, что новый отзыв сбрасывает кэш '
+            '`/api/v1/titles/{title_id}/`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url', ['/api/v1/genres/', '/api/v1/categories/'])
+    def test_03_catalogue_invalidated(self, client, admin_client, url):
+        assert client.get(url).json()['count'] == 0
+        admin_client.post(url, data={'name': 'Новое', 'slug': 'new'})
+        assert client.get(url).json()['count'] == 1, (
+            f'Проверьте, что после создания объекта `{url}` '
+            'не отдаёт устаревшие данные'
+        )
+        admin_client.delete(f'{url}new/')
+        assert client.get(url).json()['count'] == 0, (
+            f'Проверьте, что после удаления объекта `{url}` '
+            'не отдаёт устаревшие данные'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_cache_key_includes_host(self, client, admin_client):
+        create_many_titles(admin_client)
+        client.get('/api/v1/titles/', HTTP_HOST='evil.example')
+        response = client.get('/api/v1/titles/', HTTP_HOST='good.example')
+        assert response.json()['next'].startswith('http://good.example/'), (
+            'Проверьте, что закэшированный ответ с абсолютными ссылками '
+            'не отдаётся клиенту с другим заголовком Host'
+        )
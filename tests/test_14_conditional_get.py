@@ -0,0 +1,110 @@
+import pytest
+
+from .common import create_comments
+
+
+class Test14ConditionalGetAPI:
+
+    def assert_conditional(self, client, url):
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.get('ETag')
+        assert etag, (
+            f'Проверьте, что GET запрос `{url}` возвращает заголовок `ETag`'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            f'Проверьте, что GET запрос `{url}` с совпадающим '
+            '`If-None-Match` возвращает статус 304'
+        )
+        return etag
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_and_comments(self, client, admin_client, admin,
+                                     django_assert_max_num_queries):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        reviews_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+
+        reviews_etag = self.assert_conditional(client, reviews_url)
+        comments_etag = self.assert_conditional(client, comments_url)
+        self.assert_conditional(client, f'{reviews_url}{reviews[1]["id"]}/')
+        self.assert_conditional(client, f'{comments_url}{comments[0]["id"]}/')
+
+        with django_assert_max_num_queries(1):
+            response = client.get(
+                comments_url, HTTP_IF_NONE_MATCH=comments_etag)
+        assert response.status_code == 304, (
+            'Проверьте, что ответ 304 считается одним запросом к базе'
+        )
+
+        admin_client.post(comments_url, data={'text': 'Новый'})
+        response = client.get(comments_url, HTTP_IF_NONE_MATCH=comments_etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после нового комментария `ETag` '
+            'списка комментариев меняется'
+        )
+
+        admin_client.delete(f'{reviews_url}{reviews[2]["id"]}/')
+        response = client.get(reviews_url, HTTP_IF_NONE_MATCH=reviews_etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после удаления отзыва `ETag` '
+            'списка отзывов меняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_titles(self, client, admin_client, admin):
+        _, _, titles, _, _ = create_comments(admin_client, admin)
+        title_url = f'/api/v1/titles/{titles[1]["id"]}/'
+        self.assert_conditional(client, '/api/v1/titles/')
+        etag = self.assert_conditional(client, title_url)
+
+        response = client.get(title_url)
+        assert 'Last-Modified' in response, (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/` '
+            'возвращает заголовок `Last-Modified`'
+        )
+        response = client.get(
+            title_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == 304, (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/` '
+            'с `If-Modified-Since` возвращает статус 304'
+        )
+
+        admin_client.post(
+            f'{title_url}reviews/', data={'text': 'Ещё', 'score': 1})
+        response = client.get(title_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый отзыв меняет `ETag` произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_title_changed_outside_api(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        from reviews.models import Review, Title
+
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = self.assert_conditional(client, title_url)
+        assert client.get(title_url).json()['rating'] == 4
+
+        # Пересчёт рейтинга в обход вьюсета не меняет версию кэша titles.
+        Review.objects.filter(title=titles[0]['id']).update(score=10)
+        Title.objects.filter(pk=titles[0]['id']).refresh_ratings()
+        response = client.get(title_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение произведения в обход API '
+            'меняет `ETag` `/api/v1/titles/{title_id}/`'
+        )
+        assert response.json()['rating'] == 10, (
+            'Проверьте, что после изменения произведения в обход API '
+            '`/api/v1/titles/{title_id}/` не отдаётся из устаревшего кэша'
+        )
+        assert client.get(title_url).json()['rating'] == 10
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_missing_title(self, client):
+        response = client.get('/api/v1/titles/100500/reviews/')
+        assert response.status_code == 404, (
+            'Проверьте, что для несуществующего произведения '
+            '`/api/v1/titles/{title_id}/reviews/` возвращает статус 404'
+        )
@@ -0,0 +1,54 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_many_titles
+
+
+class Test15TitleFieldsAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_sparse_fields(self, client, admin_client):
+        create_many_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/?fields=name,year,rating')
+        assert response.status_code == 200, (
+            'Проверьте, что GET запрос `/api/v1/titles/?fields=` '
+            'возвращает статус 200'
+        )
+        for title in response.json()['results']:
+            assert set(title) == {'name', 'year', 'rating'}, (
+                'Проверьте, что `/api/v1/titles/?fields=` возвращает '
+                'только запрошенные поля'
+            )
+
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        assert 'description' not in sql, (
+            'Проверьте, что `/api/v1/titles/?fields=` не читает из базы '
+            'незапрошенные колонки'
+        )
+        assert 'reviews_genre' not in sql and 'reviews_category' not in sql, (
+            'Проверьте, что `/api/v1/titles/?fields=` не загружает '
+            'незапрошенные связи'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_sparse_relations(self, client, admin_client,
+                                 django_assert_max_num_queries):
+        titles, categories, genres = create_many_titles(admin_client)
+        with django_assert_max_num_queries(3):
+            response = client.get(
+                f'/api/v1/titles/{titles[0]["id"]}/?fields=genre,category')
+        assert response.json() == {
+            'genre': genres[:2], 'category': categories[0]}, (
+            'Проверьте, что `/api/v1/titles/{title_id}/?fields=` '
+            'возвращает запрошенные связи'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_unknown_field(self, client):
+        response = client.get('/api/v1/titles/?fields=name,secret')
+        assert response.status_code == 400, (
+            'Проверьте, что при неизвестном поле `/api/v1/titles/?fields=` '
+            'возвращает статус 400'
+        )
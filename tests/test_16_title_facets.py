@@ -0,0 +1,92 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test16TitleFacetsAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_facets(self, client, admin_client,
+                       django_assert_max_num_queries):
+        create_titles(admin_client)
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Ещё одно', 'year': 2000, 'genre': ['horror', 'drama'],
+            'category': 'films'})
+
+        # count + страница + жанры + один запрос на все фасеты
+        with django_assert_max_num_queries(4):
+            response = client.get(
+                '/api/v1/titles/?facets=genre,category,year')
+        assert response.status_code == 200
+        facets = response.json().get('facets')
+        assert facets == {
+            'genre': [
+                {'value': 'drama', 'count': 2},
+                {'value': 'horror', 'count': 2},
+                {'value': 'comedy', 'count': 1},
+            ],
+            'category': [
+                {'value': 'films', 'count': 2},
+                {'value': 'books', 'count': 1},
+            ],
+            'year': [
+                {'value': 2000, 'count': 2},
+                {'value': 2020, 'count': 1},
+            ],
+        }, (
+            'Проверьте, что `/api/v1/titles/?facets=` возвращает '
+            'количество произведений по жанрам, категориям и годам'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_facets_follow_filters(self, client, admin_client):
+        create_titles(admin_client)
+        response = client.get('/api/v1/titles/?genre=horror&facets=genre,year')
+        assert response.json()['facets'] == {
+            'genre': [
+                {'value': 'comedy', 'count': 1},
+                {'value': 'horror', 'count': 1},
+            ],
+            'year': [{'value': 2000, 'count': 1}],
+        }, (
+            'Проверьте, что `/api/v1/titles/?facets=` считает фасеты '
+            'по отфильтрованным произведениям'
+        )
+
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Страшилка', 'year': 2001, 'genre': ['horror'],
+            'category': 'films'})
+        response = client.get('/api/v1/titles/?genre=horror&facets=year')
+        assert response.json()['facets']['year'] == [
+            {'value': 2000, 'count': 1}, {'value': 2001, 'count': 1}], (
+            'Проверьте, что фасеты пересчитываются после изменения '
+            'произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_facets_with_search(self, client, admin_client):
+        create_titles(admin_client)
+        response = client.get('/api/v1/titles/?search=проект&facets=category')
+        assert response.json()['facets'] == {
+            'category': [{'value': 'books', 'count': 1}]}, (
+            'Проверьте, что `/api/v1/titles/?facets=` работает '
+            'вместе с полнотекстовым поиском'
+        )
+        response = client.get(
+            '/api/v1/titles/?search=проект&facets=genre,category')
+        assert response.status_code == 200
+        assert response.json()['facets'] == {
+            'genre': [{'value': 'drama', 'count': 1}],
+            'category': [{'value': 'books', 'count': 1}],
+        }, (
+            'Проверьте, что фасет `genre` работает '
+            'вместе с полнотекстовым поиском'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_unknown_facet(self, client):
+        response = client.get('/api/v1/titles/?facets=author')
+        assert response.status_code == 400, (
+            'Проверьте, что при неизвестном фасете `/api/v1/titles/` '
+            'возвращает статус 400'
+        )
@@ -0,0 +1,116 @@
+import pytest
+
+from .common import create_genre, create_categories
+
+
+class Test17GenreMaskAPI:
+
+    def create_titles(self, admin_client):
+        create_genre(admin_client)
+        create_categories(admin_client)
+        for name, genres in (
+            ('Первое', ['horror', 'comedy']),
+            ('Второе', ['drama']),
+            ('Третье', ['horror', 'drama']),
+        ):
+            admin_client.post('/api/v1/titles/', data={
+                'name': name, 'year': 2000, 'genre': genres,
+                'category': 'films'})
+
+    def names(self, client, query):
+        response = client.get(f'/api/v1/titles/?{query}')
+        assert response.status_code == 200, (
+            f'Проверьте, что GET запрос `/api/v1/titles/?{query}` '
+            'возвращает статус 200'
+        )
+        return sorted(title['name'] for title in response.json()['results'])
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_genre_all_any(self, client, admin_client):
+        self.create_titles(admin_client)
+        assert self.names(client, 'genre__all=horror,drama') == ['Третье'], (
+            'Проверьте, что `genre__all` оставляет произведения '
+            'со всеми перечисленными жанрами'
+        )
+        assert self.names(client, 'genre__any=comedy,drama') == [
+            'Второе', 'Первое', 'Третье'], (
+            'Проверьте, что `genre__any` оставляет произведения '
+            'хотя бы с одним из перечисленных жанров'
+        )
+        assert self.names(client, 'genre__all=horror,unknown') == [], (
+            'Проверьте, что `genre__all` с несуществующим жанром '
+            'ничего не находит'
+        )
+        response = client.get(
+            '/api/v1/titles/?genre__all=horror&facets=genre')
+        assert response.json()['facets']['genre'][0] == {
+            'value': 'horror', 'count': 2}, (
+            'Проверьте, что `genre__all` работает вместе с фасетами'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_mask_follows_changes(self, client, admin_client):
+        from reviews.models import Title
+
+        self.create_titles(admin_client)
+        title = Title.objects.get(name='Второе')
+        admin_client.patch(
+            f'/api/v1/titles/{title.pk}/', data={'genre': ['comedy']})
+        assert self.names(client, 'genre__any=comedy') == [
+            'Второе', 'Первое'], (
+            'Проверьте, что маска жанров обновляется при изменении '
+            'жанров произведения'
+        )
+        admin_client.delete('/api/v1/genres/horror/')
+        assert Title.objects.get(name='Третье').genre_mask == 1 << 2, (
+            'Проверьте, что при удалении жанра его бит снимается '
+            'с произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_fallback_without_bits(self, client, admin_client):
+        from reviews.models import GENRE_MASK_BITS, Genre, Title
+
+        self.create_titles(admin_client)
+        for number in range(GENRE_MASK_BITS):
+            Genre.objects.create(name=f'Жанр {number}', slug=f'g{number}')
+        overflow = Genre.objects.create(name='Лишний', slug='overflow')
+        assert overflow.bit is None
+        Title.objects.get(name='Второе').genre.add(overflow)
+
+        assert self.names(client, 'genre__all=drama,overflow') == [
+            'Второе'], (
+            'Проверьте, что `genre__all` работает для жанров вне маски'
+        )
+        assert self.names(client, 'genre__any=comedy,overflow') == [
+            'Второе', 'Первое'], (
+            'Проверьте, что `genre__any` работает для жанров вне маски'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_concurrent_bit(self, admin_client, monkeypatch):
+        from reviews.models import Genre
+
+        create_genre(admin_client)
+        taken = Genre.objects.get(slug='horror').bit
+        free_bit = Genre.free_bit.__func__
+        calls = []
+
+        def stale_free_bit(cls):
+            # Первый вызов видит состояние до параллельной вставки.
+            calls.append(1)
+            return taken if len(calls) == 1 else free_bit(cls)
+
+        monkeypatch.setattr(Genre, 'free_bit', classmethod(stale_free_bit))
+        response = admin_client.post(
+            '/api/v1/genres/', data={'name': 'Мюзикл', 'slug': 'musical'})
+        assert response.status_code == 201, (
+            'Проверьте, что жанр создаётся, даже если его бит '
+            'занял параллельный запрос'
+        )
+        genre = Genre.objects.get(slug='musical')
+        assert genre.bit is not None and genre.bit != taken
+
+        response = admin_client.post(
+            '/api/v1/genres/', data={'name': 'Мюзикл', 'slug': 'musical'})
+        assert response.status_code == 400
@@ -0,0 +1,159 @@
+import json
+
+import pytest
+
+from .common import (
+    create_categories, create_genre, create_many_titles, create_titles,
+)
+
+
+class Test18TitleBulkAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_get(self, client, admin_client,
+                         django_assert_max_num_queries):
+        create_many_titles(admin_client)
+        from reviews.models import Title
+
+        ids = list(Title.objects.values_list('id', flat=True))
+        requested = [ids[5], ids[0], 100500, ids[3], ids[0]]
+        with django_assert_max_num_queries(2):
+            response = client.post(
+                '/api/v1/titles/bulk-get/', data={'ids': requested},
+                format='json')
+        assert response.status_code == 200, (
+            'Проверьте, что POST запрос `/api/v1/titles/bulk-get/` '
+            'доступен без токена и возвращает статус 200'
+        )
+        assert [title['id'] for title in response.json()] == [
+            ids[5], ids[0], ids[3]], (
+            'Проверьте, что `/api/v1/titles/bulk-get/` возвращает '
+            'существующие произведения в запрошенном порядке без повторов'
+        )
+
+        response = client.post(
+            '/api/v1/titles/bulk-get/?fields=name', data={'ids': ids[:2]},
+            format='json')
+        assert response.json() == [
+            {'name': 'Поворот туда'}, {'name': 'Проект'}], (
+            'Проверьте, что `/api/v1/titles/bulk-get/` поддерживает `fields`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_bulk_get_limits(self, client):
+        for data in ({'ids': []}, {'ids': list(range(1, 502))}, {}):
+            response = client.post(
+                '/api/v1/titles/bulk-get/', data=data, format='json')
+            assert response.status_code == 400, (
+                'Проверьте, что `/api/v1/titles/bulk-get/` проверяет '
+                'список `ids`'
+            )
+
+    def bulk_items(self, count):
+        return [
+            {
+                'name': f'Пакетное {number}',
+                'year': 1990 + number % 30,
+                'description': f'Описание {number}',
+                'genre': ['horror', 'drama'] if number % 2 else ['comedy'],
+                'category': 'films',
+            }
+            for number in range(count)
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_bulk_create(self, client, admin_client,
+                            django_assert_max_num_queries):
+        create_genre(admin_client)
+        create_categories(admin_client)
+        from reviews.models import Genre, Title
+
+        with django_assert_max_num_queries(20):
+            response = admin_client.post(
+                '/api/v1/titles/bulk/', data=self.bulk_items(300),
+                format='json')
+        assert response.status_code == 201, (
+            'Проверьте, что администратор может создать произведения '
+            'POST запросом `/api/v1/titles/bulk/`'
+        )
+        created = response.json()['created']
+        assert len(created) == 300 and response.json()['updated'] == [], (
+            'Проверьте, что `/api/v1/titles/bulk/` возвращает id '
+            'созданных произведений'
+        )
+        title = Title.objects.get(pk=created[1])
+        assert title.name == 'Пакетное 1' and set(
+            title.genre.values_list('slug', flat=True)) == {
+            'horror', 'drama'}, (
+            'Проверьте, что id в ответе соответствуют порядку входных данных '
+            'и что жанры привязаны к произведениям'
+        )
+        horror = Genre.objects.get(slug='horror')
+        assert title.genre_mask & (1 << horror.bit), (
+            'Проверьте, что пакетная запись обновляет маску жанров'
+        )
+        response = client.get('/api/v1/titles/?search=Пакетное 299')
+        assert [item['id'] for item in response.json()['results']] == [
+            created[299]], (
+            'Проверьте, что созданные пакетом произведения попадают '
+            'в полнотекстовый поиск'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_bulk_update_and_errors(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        from reviews.models import Title
+
+        items = self.bulk_items(2)
+        items[0]['id'] = titles[0]['id']
+        items[0]['genre'] = ['drama']
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', data=items, format='json')
+        assert response.status_code == 201
+        assert response.json()['updated'] == [titles[0]['id']], (
+            'Проверьте, что элементы с `id` обновляют существующие '
+            'произведения'
+        )
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert title.name == 'Пакетное 0' and list(
+            title.genre.values_list('slug', flat=True)) == ['drama'], (
+            'Проверьте, что пакетное обновление заменяет поля и жанры'
+        )
+
+        count = Title.objects.count()
+        items = self.bulk_items(3)
+        items[1]['genre'] = ['unknown']
+        items[2]['year'] = 3000
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', data=items, format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {} and 'genre' in errors[1] \
+            and 'year' in errors[2], (
+                'Проверьте, что ошибки `/api/v1/titles/bulk/` возвращаются '
+                'списком по позициям входных данных'
+            )
+        items = self.bulk_items(2)
+        items[1]['id'] = 100500
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', data=items, format='json')
+        assert response.status_code == 400 and 'id' in response.json()[1]
+        items[0]['year'] = 3000
+        items[0]['id'] = 100501
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', data=items, format='json')
+        errors = response.json()
+        assert set(errors[0]) == {'year', 'id'} and 'id' in errors[1], (
+            'Проверьте, что ошибки `id` возвращаются вместе с ошибками '
+            'полей для всех элементов'
+        )
+        assert Title.objects.count() == count, (
+            'Проверьте, что при ошибке в любом элементе ничего не записывается'
+        )
+
+        response = client.post(
+            '/api/v1/titles/bulk/', data=json.dumps(items),
+            content_type='application/json')
+        assert response.status_code == 401, (
+            'Проверьте, что `/api/v1/titles/bulk/` недоступен без токена'
+        )
@@ -0,0 +1,68 @@
+import pytest
+from django.core.management import call_command
+
+from .common import create_many_titles
+
+
+class Test19SimilarTitles:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_similar_titles(self, client, admin_client, django_user_model,
+                               django_assert_max_num_queries):
+        create_many_titles(admin_client)
+        from reviews.models import Review, SimilarTitle, Title
+
+        titles = list(Title.objects.order_by('id')[:4])
+        users = [
+            django_user_model.objects.create_user(
+                username=f'critic{number}', email=f'critic{number}@yamdb.fake')
+            for number in range(3)
+        ]
+        scores = {
+            titles[0]: (9, 7, 2),
+            titles[1]: (9, 7, 2),
+            titles[2]: (2, 9, None),
+            titles[3]: (9, None, None),
+        }
+        for title, values in scores.items():
+            for user, score in zip(users, values):
+                if score is not None:
+                    Review.objects.create(
+                        title=title, author=user, text='Отзыв', score=score)
+
+        call_command('build_similar_titles', '--top-k', '2')
+
+        assert SimilarTitle.objects.filter(title=titles[0]).count() == 2
+        url = f'/api/v1/titles/{titles[0].id}/similar/'
+        with django_assert_max_num_queries(3):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что GET запрос `{url}` доступен без токена'
+        )
+        assert [title['id'] for title in response.json()] == [
+            titles[1].id, titles[2].id], (
+            'Проверьте, что похожие произведения отсортированы по сходству '
+            'и не включают произведения без общих оценок двух пользователей'
+        )
+        assert SimilarTitle.objects.get(
+            title=titles[0], similar=titles[1]).score == pytest.approx(1), (
+            'Проверьте, что сходство — косинус векторов оценок'
+        )
+
+        response = client.get(
+            f'/api/v1/titles/{titles[3].id}/similar/?fields=name')
+        assert response.json() == [], (
+            'Проверьте, что для произведения без соседей возвращается '
+            'пустой список'
+        )
+        response = client.get('/api/v1/titles/100500/similar/')
+        assert response.status_code == 404, (
+            'Проверьте, что для несуществующего произведения '
+            'возвращается статус 404'
+        )
+
+        call_command('build_similar_titles', '--top-k', '1')
+        assert SimilarTitle.objects.filter(title=titles[0]).count() == 1, (
+            'Проверьте, что `build_similar_titles` пересчитывает таблицу '
+            'целиком'
+        )
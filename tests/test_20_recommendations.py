@@ -0,0 +1,124 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import auth_client, create_many_titles
+
+
+class Test20Recommendations:
+
+    def create_reviews(self, admin_client, django_user_model):
+        create_many_titles(admin_client)
+        from reviews.models import Review, Title
+
+        titles = list(Title.objects.order_by('id')[:6])
+        users = [
+            django_user_model.objects.create_user(
+                username=f'reader{number}', email=f'reader{number}@yamdb.fake')
+            for number in range(4)
+        ]
+        for number, user in enumerate(users):
+            for offset in range(3):
+                Review.objects.create(
+                    title=titles[(number + offset) % len(titles)],
+                    author=user, text='Отзыв', score=10 - offset * 3)
+        return titles, users
+
+    def recommended(self, user):
+        from reviews.models import Recommendation
+
+        return list(Recommendation.objects.filter(user=user).order_by(
+            '-score', 'title').values_list('title', 'score'))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_recommendations(self, client, admin_client,
+                                django_user_model,
+                                django_assert_max_num_queries):
+        titles, users = self.create_reviews(admin_client, django_user_model)
+        from reviews.models import Review
+
+        call_command(
+            'build_recommendations', '--factors', '4', '--top-n', '2',
+            stdout=StringIO())
+
+        recommended = self.recommended(users[0])
+        rated = set(Review.objects.filter(author=users[0]).values_list(
+            'title', flat=True))
+        assert len(recommended) == 2 and not rated & {
+            title for title, _ in recommended}, (
+            'Проверьте, что `build_recommendations` сохраняет top-N '
+            'произведений, которые пользователь ещё не оценил'
+        )
+
+        url = '/api/v1/users/me/recommendations/'
+        user_client = auth_client(users[0])
+        with django_assert_max_num_queries(4):
+            response = user_client.get(url)
+        assert response.status_code == 200
+        assert [title['id'] for title in response.json()] == [
+            title for title, _ in recommended], (
+            f'Проверьте, что `{url}` возвращает рекомендации '
+            'в порядке предсказанной оценки'
+        )
+        assert client.get(url).status_code == 401, (
+            f'Проверьте, что `{url}` недоступен без токена'
+        )
+
+        Review.objects.create(
+            title_id=recommended[0][0], author=users[0], text='Отзыв',
+            score=5)
+        assert [title['id'] for title in user_client.get(url).json()] == [
+            recommended[1][0]], (
+            f'Проверьте, что `{url}` не возвращает произведения, '
+            'оценённые после расчёта'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_incremental(self, admin_client, django_user_model):
+        titles, users = self.create_reviews(admin_client, django_user_model)
+        from reviews.models import RecommendationState, Review
+
+        call_command(
+            'build_recommendations', '--factors', '4', stdout=StringIO())
+        before = self.recommended(users[1])
+
+        Review.objects.create(
+            title=titles[5], author=users[0], text='Отзыв', score=1)
+        Review.objects.filter(author=users[3]).delete()
+        output = StringIO()
+        call_command('build_recommendations', '--incremental', stdout=output)
+        assert 'Пересчитано пользователей: 1, удалено: 1' in \
+            output.getvalue(), (
+                'Проверьте, что `build_recommendations --incremental` '
+                'пересчитывает только пользователей с изменёнными отзывами'
+            )
+        assert titles[5].id not in {
+            title for title, _ in self.recommended(users[0])}
+        assert self.recommended(users[3]) == [] and not \
+            RecommendationState.objects.filter(user=users[3]).exists()
+        assert self.recommended(users[1]) == before, (
+            'Проверьте, что рекомендации остальных пользователей '
+            'не меняются при частичном пересчёте'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_workers(self, admin_client, django_user_model):
+        _, users = self.create_reviews(admin_client, django_user_model)
+
+        call_command(
+            'build_recommendations', '--factors', '4', '--block-size', '2',
+            stdout=StringIO())
+        single = [self.recommended(user) for user in users]
+        call_command(
+            'build_recommendations', '--factors', '4', '--block-size', '2',
+            '--workers', '2', stdout=StringIO())
+        parallel = [self.recommended(user) for user in users]
+        assert [[title for title, _ in row] for row in single] == [
+            [title for title, _ in row] for row in parallel], (
+            'Проверьте, что расчёт в нескольких процессах даёт '
+            'тот же результат'
+        )
+        for row_single, row_parallel in zip(single, parallel):
+            assert [score for _, score in row_single] == pytest.approx(
+                [score for _, score in row_parallel])
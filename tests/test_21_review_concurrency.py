@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+
+from .common import auth_client, create_titles
+
+
+class Test21ReviewConcurrency:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_duplicate_review(self, admin_client, django_user_model,
+                                 django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        user = django_user_model.objects.create_user(
+            username='critic', email='critic@yamdb.fake')
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        client = auth_client(user)
+        data = {'text': 'Отзыв', 'score': 7}
+
+        # Пользователь, произведение, вставка в транзакции, пересчёт
+        # рейтинга и поискового индекса.
+        with django_assert_max_num_queries(8) as captured:
+            client.post(url, data=data)
+        statements = [query['sql'] for query in captured.captured_queries]
+        insert = next(
+            number for number, sql in enumerate(statements)
+            if sql.startswith('INSERT INTO "reviews_review"'))
+        assert not any(
+            'FROM "reviews_review"' in sql for sql in statements[:insert]), (
+            'Проверьте, что повторный отзыв отсекается ограничением '
+            'в базе, а не запросом перед вставкой'
+        )
+        response = client.post(url, data=data)
+        assert response.status_code == 400, (
+            f'Проверьте, что повторный POST запрос `{url}` '
+            'возвращает статус 400'
+        )
+        assert response.json() == {'non_field_errors': [
+            'Вы уже оставили отзыв на данное произведение!']}, (
+            'Проверьте текст ошибки при повторном отзыве'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_parallel_duplicate_reviews(self, admin_client,
+                                           django_user_model):
+        titles, _, _ = create_titles(admin_client)
+        from reviews.models import Review, Title
+
+        user = django_user_model.objects.create_user(
+            username='critic', email='critic@yamdb.fake')
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        workers = 8
+        barrier = threading.Barrier(workers)
+
+        def post(score):
+            client = auth_client(user)
+            barrier.wait()
+            try:
+                return client.post(url, data={'text': 'Отзыв', 'score': score})
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(workers) as executor:
+            responses = list(executor.map(post, range(1, workers + 1)))
+
+        codes = sorted(response.status_code for response in responses)
+        assert codes == [201] + [400] * (workers - 1), (
+            'Проверьте, что из параллельных POST запросов одного автора '
+            'к одному произведению успешен ровно один, а остальные '
+            f'получают статус 400, получено {codes}'
+        )
+        review = Review.objects.get(author=user)
+        assert Title.objects.get(pk=titles[0]['id']).rating == review.score, (
+            'Проверьте, что рейтинг произведения учитывает '
+            'единственный сохранённый отзыв'
+        )
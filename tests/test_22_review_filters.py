@@ -0,0 +1,82 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test22ReviewFilters:
+
+    def create_reviews(self, admin_client, django_user_model):
+        titles, _, _ = create_titles(admin_client)
+        from reviews.models import Review
+
+        reviews = []
+        for number, score in enumerate((3, 9, 5, 9, 1)):
+            user = django_user_model.objects.create_user(
+                username=f'critic{number}', email=f'critic{number}@yamdb.fake')
+            reviews.append(Review.objects.create(
+                title_id=titles[0]['id'], author=user, text='Отзыв',
+                score=score))
+        return titles[0]['id'], reviews
+
+    def ids(self, client, url):
+        response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что GET запрос `{url}` возвращает статус 200'
+        )
+        return [review['id'] for review in response.json()['results']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_filters(self, client, admin_client, django_user_model):
+        title_id, reviews = self.create_reviews(
+            admin_client, django_user_model)
+        url = f'/api/v1/titles/{title_id}/reviews/'
+
+        assert self.ids(client, url) == [
+            review.id for review in reversed(reviews)], (
+            'Проверьте, что отзывы по умолчанию отсортированы '
+            'от новых к старым'
+        )
+        assert set(self.ids(client, f'{url}?score_min=5&score_max=9')) == {
+            reviews[1].id, reviews[2].id, reviews[3].id}, (
+            'Проверьте фильтры `score_min` и `score_max`'
+        )
+        assert self.ids(client, f'{url}?author=critic2') == [
+            reviews[2].id], (
+            'Проверьте фильтр `author` по имени пользователя'
+        )
+        pub_date = client.get(
+            f'{url}{reviews[3].id}/').json()['pub_date']
+        assert self.ids(client, f'{url}?pub_date_after={pub_date}') == [
+            reviews[4].id, reviews[3].id], (
+            'Проверьте фильтр `pub_date_after`'
+        )
+        assert self.ids(client, f'{url}?pub_date_before={pub_date}') == [
+            reviews[3].id, reviews[2].id, reviews[1].id, reviews[0].id], (
+            'Проверьте фильтр `pub_date_before`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_ordering(self, client, admin_client, django_user_model):
+        title_id, reviews = self.create_reviews(
+            admin_client, django_user_model)
+        url = f'/api/v1/titles/{title_id}/reviews/'
+
+        assert self.ids(client, f'{url}?ordering=-score') == [
+            reviews[3].id, reviews[1].id, reviews[2].id, reviews[0].id,
+            reviews[4].id], (
+            'Проверьте сортировку `ordering=-score`: при равной оценке '
+            'первым идёт более новый отзыв'
+        )
+        assert self.ids(client, f'{url}?ordering=score') == [
+            reviews[4].id, reviews[0].id, reviews[2].id, reviews[1].id,
+            reviews[3].id], (
+            'Проверьте сортировку `ordering=score`'
+        )
+        assert self.ids(client, f'{url}?ordering=pub_date') == [
+            review.id for review in reviews], (
+            'Проверьте сортировку `ordering=pub_date`'
+        )
+        response = client.get(f'{url}?ordering=text')
+        assert response.status_code == 400, (
+            'Проверьте, что сортировка по другим полям не поддерживается'
+        )
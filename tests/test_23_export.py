@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+
+import pytest
+
+from .common import auth_client, create_comments, create_reviews
+
+
+class Test23Export:
+
+    def content(self, response):
+        assert response.streaming, (
+            'Проверьте, что выгрузка отдаётся потоком'
+        )
+        return b''.join(response.streaming_content).decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_export_reviews(self, admin_client, admin, monkeypatch):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        response = admin_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/',
+            data={'text': 'Другое', 'score': 8})
+        reviews.append({'id': response.json()['id'], 'author': admin.username})
+        from api import export
+
+        monkeypatch.setattr(export, 'EXPORT_CHUNK_SIZE', 2)
+        url = '/api/v1/export/reviews/'
+        response = admin_client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что GET запрос `{url}` доступен админу'
+        )
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(
+            response).splitlines()]
+        assert [row['id'] for row in rows] == sorted(
+            review['id'] for review in reviews), (
+            f'Проверьте, что `{url}` выгружает все отзывы по возрастанию id'
+        )
+        assert set(rows[0]) == {
+            'id', 'title', 'author', 'score', 'text', 'pub_date'}
+        assert rows[0]['author'] == reviews[0]['author']
+
+        after = rows[0]['id']
+        rows = [json.loads(line) for line in self.content(admin_client.get(
+            f'{url}?after={after}&title={titles[0]["id"]}')).splitlines()]
+        assert [row['id'] for row in rows] == [
+            review['id'] for review in reviews[1:3]], (
+            f'Проверьте параметры `after` и `title` у `{url}`'
+        )
+
+        response = admin_client.get(f'{url}?output=csv')
+        assert response['Content-Type'].startswith('text/csv')
+        table = list(csv.DictReader(io.StringIO(self.content(response))))
+        assert len(table) == len(reviews) and table[0]['pub_date'].endswith(
+            'Z'), (
+            f'Проверьте выгрузку `{url}?output=csv`'
+        )
+        assert admin_client.get(
+            f'{url}?output=xml').status_code == 400, (
+            f'Проверьте, что `{url}` проверяет параметр `output`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_export_comments(self, client, admin_client, admin):
+        comments, reviews, titles, user, moderator = create_comments(
+            admin_client, admin)
+        url = '/api/v1/export/comments/'
+
+        rows = [json.loads(line) for line in self.content(
+            auth_client(moderator).get(
+                f'{url}?review={reviews[0]["id"]}')).splitlines()]
+        assert rows and all(
+            row['review'] == reviews[0]['id'] for row in rows), (
+            f'Проверьте, что `{url}` доступен модератору '
+            'и фильтрует по `review`'
+        )
+        assert client.get(url).status_code == 401
+        assert auth_client(user).get(url).status_code == 403, (
+            f'Проверьте, что `{url}` недоступен обычному пользователю'
+        )
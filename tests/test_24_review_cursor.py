@@ -0,0 +1,116 @@
+import base64
+import json
+from urllib.parse import parse_qs, quote, urlparse
+
+import pytest
+
+from .common import create_titles
+
+
+class Test24ReviewCommentCursor:
+
+    def walk_cursor(self, client, url):
+        ids = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200, (
+                f'Проверьте, что при GET запросе `{url}` '
+                'возвращается статус 200'
+            )
+            data = response.json()
+            assert set(data) == {'next', 'results'}, (
+                'Проверьте, что в режиме курсора возвращаются '
+                'только `next` и `results`'
+            )
+            ids.extend(item['id'] for item in data['results'])
+            url = data['next']
+        return ids
+
+    def create_reviews(self, admin_client, django_user_model):
+        titles, _, _ = create_titles(admin_client)
+        from reviews.models import Comment, Review
+
+        reviews = []
+        for number in range(23):
+            user = django_user_model.objects.create_user(
+                username=f'critic{number}', email=f'critic{number}@yamdb.fake')
+            reviews.append(Review.objects.create(
+                title_id=titles[0]['id'], author=user, text='Отзыв',
+                score=number % 4 + 1))
+        for review in reviews:
+            Comment.objects.create(
+                review=reviews[0], author=review.author, text='Комментарий')
+        return titles[0]['id'], reviews
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_cursor(self, client, admin_client,
+                               django_user_model):
+        title_id, _ = self.create_reviews(admin_client, django_user_model)
+        from reviews.models import Review
+
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        expected = list(Review.objects.filter(title=title_id).order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+        assert self.walk_cursor(client, f'{url}?cursor=') == expected, (
+            f'Проверьте, что курсор `{url}?cursor=` обходит все отзывы '
+            'от новых к старым без пропусков и повторов'
+        )
+
+        expected = list(Review.objects.filter(
+            title=title_id, score__gte=2).order_by(
+            '-score', '-id').values_list('id', flat=True))
+        assert self.walk_cursor(
+            client, f'{url}?score_min=2&ordering=-score&cursor='
+        ) == expected, (
+            'Проверьте, что курсор по отзывам учитывает фильтры '
+            'и параметр `ordering`'
+        )
+
+        response = client.get(f'{url}?cursor=broken')
+        assert response.status_code == 404, (
+            'Проверьте, что неверный курсор возвращает статус 404'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_comments_cursor(self, client, admin_client,
+                                django_user_model):
+        title_id, reviews = self.create_reviews(
+            admin_client, django_user_model)
+        from reviews.models import Comment
+
+        url = f'/api/v1/titles/{title_id}/reviews/{reviews[0].id}/comments/'
+        expected = list(Comment.objects.filter(review=reviews[0]).order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+        assert self.walk_cursor(client, f'{url}?cursor=') == expected, (
+            f'Проверьте, что курсор `{url}?cursor=` обходит все комментарии '
+            'от новых к старым без пропусков и повторов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cursor_ordering(self, client, admin_client,
+                                django_user_model):
+        title_id, reviews = self.create_reviews(
+            admin_client, django_user_model)
+        url = f'/api/v1/titles/{title_id}/reviews/'
+
+        next_url = client.get(f'{url}?cursor=').json()['next']
+        cursor = parse_qs(urlparse(next_url).query)['cursor'][0]
+        response = client.get(url, {'ordering': 'score', 'cursor': cursor})
+        assert response.status_code == 404, (
+            'Проверьте, что курсор, полученный при другом `ordering`, '
+            'возвращает статус 404'
+        )
+
+        cursor = base64.urlsafe_b64encode(json.dumps({
+            'ordering': ['-pub_date', '-pk'], 'position': ['вчера', 1],
+        }).encode()).decode()
+        assert client.get(url, {'cursor': cursor}).status_code == 404, (
+            'Проверьте, что курсор с неверной датой возвращает статус 404'
+        )
+
+        ids = self.walk_cursor(
+            client, f'{url}?search={quote("отзыв")}&cursor=')
+        assert sorted(ids) == sorted(review.id for review in reviews), (
+            'Проверьте, что курсор обходит результаты поиска '
+            'без пропусков и повторов'
+        )
@@ -0,0 +1,164 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import auth_client, create_comments
+
+
+class Test25CommentsCount:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_comments_count(self, client, admin_client, admin):
+        comments, reviews, titles, user, _ = create_comments(
+            admin_client, admin)
+        from reviews.models import Review
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(f'{url}{reviews[0]["id"]}/')
+        assert response.json().get('comments_count') == len(comments), (
+            f'Проверьте, что `{url}{{review_id}}/` возвращает '
+            'число комментариев `comments_count`'
+        )
+        counts = {
+            review['id']: review['comments_count']
+            for review in client.get(url).json()['results']
+        }
+        assert counts[reviews[1]['id']] == 0
+
+        comments_url = f'{url}{reviews[0]["id"]}/comments/'
+        auth_client(user).patch(
+            f'{comments_url}{comments[1]["id"]}/', data={'text': 'Правка'})
+        assert Review.objects.get(
+            pk=reviews[0]['id']).comments_count == len(comments), (
+            'Проверьте, что изменение комментария не меняет счётчик'
+        )
+        auth_client(user).delete(f'{comments_url}{comments[1]["id"]}/')
+        assert Review.objects.get(
+            pk=reviews[0]['id']).comments_count == len(comments) - 1, (
+            'Проверьте, что удаление комментария уменьшает счётчик'
+        )
+        response = admin_client.patch(
+            f'{url}{reviews[0]["id"]}/', data={'comments_count': 100})
+        assert response.json()['comments_count'] == len(comments) - 1, (
+            'Проверьте, что `comments_count` нельзя изменить через API'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_repair_command(self, admin_client, admin):
+        comments, reviews, _, _, _ = create_comments(admin_client, admin)
+        from reviews.models import Review
+
+        Review.objects.update(comments_count=7)
+        output = StringIO()
+        call_command('repair_comment_counts', stdout=output)
+        assert dict(Review.objects.values_list('id', 'comments_count')) == {
+            reviews[0]['id']: len(comments),
+            reviews[1]['id']: 0,
+            reviews[2]['id']: 0,
+        }, (
+            'Проверьте, что `repair_comment_counts` пересчитывает счётчики'
+        )
+        assert 'Исправлено счётчиков: 3' in output.getvalue()
+
+    def assert_changed(self, client, path, etag):
+        response = client.get(path, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после изменения счётчика комментариев '
+            f'`{path}` не отвечает 304 на старый ETag'
+        )
+        return response
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_review_list_etag(self, client, admin_client, admin):
+        comments, reviews, titles, user, moderator = create_comments(
+            admin_client, admin)
+        from reviews.models import Review
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        detail_url = f'{url}{reviews[1]["id"]}/'
+
+        etag = client.get(url)['ETag']
+        auth_client(user).post(
+            f'{detail_url}comments/', data={'text': 'Новый'})
+        response = self.assert_changed(client, url, etag)
+        counts = {
+            review['id']: review['comments_count']
+            for review in response.json()['results']
+        }
+        assert counts[reviews[1]['id']] == 1
+
+        etag = client.get(url)['ETag']
+        auth_client(moderator).post(
+            '/api/v1/moderation/comments/',
+            data=json.dumps({'action': 'hide', 'ids': [comments[0]['id']]}),
+            content_type='application/json')
+        self.assert_changed(client, url, etag)
+
+        Review.objects.update(comments_count=7)
+        list_etag = client.get(url)['ETag']
+        detail_etag = client.get(detail_url)['ETag']
+        call_command('repair_comment_counts', stdout=StringIO())
+        self.assert_changed(client, url, list_etag)
+        self.assert_changed(client, detail_url, detail_etag)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_cascade_delete_queries(self, admin_client, admin,
+                                       django_assert_max_num_queries):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        from django.contrib.auth import get_user_model
+        from reviews.models import Comment, Review, Title
+
+        Comment.objects.bulk_create([
+            Comment(review_id=reviews[1]['id'], author=admin, text='spam')
+            for _ in range(100)
+        ])
+        Review.objects.all().refresh_comments_count()
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/'
+        with django_assert_max_num_queries(20):
+            response = admin_client.delete(url)
+        assert response.status_code == 204
+        assert Title.objects.get(pk=titles[0]['id']).reviews_count == 2, (
+            'Проверьте, что удаление отзыва пересчитывает рейтинг'
+        )
+
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(username=f'reader{index}', email=f'reader{index}@yamdb.fake')
+            for index in range(50)
+        ])
+        Review.objects.bulk_create([
+            Review(title_id=titles[1]['id'], author=author, text='spam',
+                   score=5)
+            for author in User.objects.filter(username__startswith='reader')
+        ])
+        with django_assert_max_num_queries(20):
+            response = admin_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        assert response.status_code == 204, (
+            'Проверьте, что каскадное удаление не пересчитывает рейтинг '
+            'и счётчики по каждому отзыву и комментарию'
+        )
+        assert not Review.objects.filter(text='spam').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_drifted_counter(self, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        from reviews.models import Comment, Review
+
+        review = Review.objects.filter(pk=reviews[0]['id'])
+        review.update(comments_count=0)
+        url = (f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+               f'{reviews[0]["id"]}/comments/{comments[0]["id"]}/')
+        response = admin_client.delete(url)
+        assert response.status_code == 204, (
+            'Проверьте, что удаление комментария не падает, '
+            'если счётчик разошёлся с числом комментариев'
+        )
+        assert review.get().comments_count == len(comments) - 1
+
+        review.update(comments_count=0)
+        Comment.objects.get(pk=comments[1]['id']).delete()
+        assert review.get().comments_count == 0, (
+            'Проверьте, что счётчик комментариев не уходит ниже нуля'
+        )
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+from .common import auth_client, create_comments, create_reviews
+
+
+def moderate(client, resource, **data):
+    return client.post(
+        f'/api/v1/moderation/{resource}/', data=json.dumps(data),
+        content_type='application/json')
+
+
+class Test26Moderation:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_permissions(self, client, admin_client, admin):
+        reviews, _, user, moderator = create_reviews(admin_client, admin)
+        ids = [review['id'] for review in reviews]
+
+        response = moderate(client, 'reviews', action='delete', ids=ids)
+        assert response.status_code == 401
+        response = moderate(
+            auth_client(user), 'reviews', action='delete', ids=ids)
+        assert response.status_code == 403, (
+            'Проверьте, что массовая модерация недоступна пользователю'
+        )
+        response = moderate(
+            auth_client(moderator), 'reviews', action='delete')
+        assert response.status_code == 400, (
+            'Проверьте, что без `ids` и `author` возвращается статус 400'
+        )
+        response = moderate(
+            auth_client(moderator), 'reviews', action='delete',
+            ids=ids, author=user.username)
+        assert response.status_code == 400, (
+            'Проверьте, что `ids` и `author` нельзя передать вместе'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_hide_and_show_reviews(self, client, admin_client, admin):
+        reviews, titles, user, moderator = create_reviews(
+            admin_client, admin)
+        from reviews.models import Title
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+
+        response = moderate(
+            auth_client(moderator), 'reviews', action='hide',
+            author=user.username)
+        assert response.status_code == 200
+        assert response.json() == {'action': 'hide', 'count': 1}
+        listed = {
+            review['id'] for review in
+            client.get(f'{url}reviews/').json()['results']
+        }
+        assert listed == {reviews[0]['id'], reviews[2]['id']}, (
+            'Проверьте, что скрытые отзывы не попадают в список'
+        )
+        assert client.get(
+            f'{url}reviews/{reviews[1]["id"]}/').status_code == 404
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating, title.reviews_count) == (4.5, 2), (
+            'Проверьте, что скрытые отзывы не учитываются в рейтинге'
+        )
+
+        moderate(
+            auth_client(moderator), 'reviews', action='show',
+            ids=[reviews[1]['id']])
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating, title.reviews_count) == (4, 3), (
+            'Проверьте, что показанный снова отзыв учитывается в рейтинге'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_comments(self, client, admin_client, admin):
+        comments, reviews, titles, user, moderator = create_comments(
+            admin_client, admin)
+        from reviews.models import Comment, Review
+
+        url = (f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+               f'{reviews[0]["id"]}/')
+        moderate(
+            auth_client(moderator), 'comments', action='hide',
+            ids=[comments[0]['id']])
+        assert client.get(url).json()['comments_count'] == 2, (
+            'Проверьте, что скрытые комментарии не учитываются в счётчике'
+        )
+        assert len(client.get(f'{url}comments/').json()['results']) == 2
+
+        response = moderate(
+            auth_client(moderator), 'comments', action='delete',
+            ids=[comment['id'] for comment in comments])
+        assert response.json()['count'] == 3
+        assert not Comment.objects.exists()
+        assert Review.objects.get(pk=reviews[0]['id']).comments_count == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_bulk_delete_queries(self, admin_client, admin,
+                                    django_assert_max_num_queries):
+        from django.contrib.auth import get_user_model
+        from reviews.models import Comment, Review, Title
+
+        _, titles, _, moderator = create_reviews(admin_client, admin)
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(username=f'reader{index}', email=f'reader{index}@yamdb.fake')
+            for index in range(1200)
+        ])
+        users = User.objects.filter(username__startswith='reader')
+        Review.objects.bulk_create([
+            Review(
+                title_id=titles[index % 2]['id'], author=author,
+                text='spam', score=1 + index % 10)
+            for index, author in enumerate(users)
+        ])
+        spam = list(Review.objects.filter(
+            text='spam').values_list('pk', flat=True))
+        Comment.objects.bulk_create([
+            Comment(review_id=review_id, author=admin, text='spam')
+            for review_id in spam[:100]
+        ])
+        Title.objects.all().refresh_ratings()
+
+        moderator_client = auth_client(moderator)
+        # Три порции по 500 отзывов: число запросов зависит от числа
+        # порций, а не от числа отзывов.
+        with django_assert_max_num_queries(40):
+            response = moderate(
+                moderator_client, 'reviews', action='delete', ids=spam)
+        assert response.json()['count'] == len(spam)
+        assert not Review.objects.filter(text='spam').exists()
+        assert not Comment.objects.exists()
+        assert Title.objects.get(pk=titles[0]['id']).reviews_count == 3, (
+            'Проверьте, что рейтинг пересчитан после массового удаления'
+        )
+        assert Title.objects.get(pk=titles[0]['id']).rating == 4
+        assert Title.objects.get(pk=titles[1]['id']).rating is None
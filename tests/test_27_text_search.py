@@ -0,0 +1,141 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import auth_client, create_comments, create_reviews
+
+
+class Test27TextSearch:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_review_search(self, client, admin_client, admin):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        auth_client(user).patch(
+            f'{url}{reviews[1]["id"]}/',
+            data={'text': 'Отличный сюжет, но <b>финал</b> затянут'})
+        admin_client.patch(
+            f'{url}{reviews[0]["id"]}/',
+            data={'text': 'Сюжет, сюжет и ещё раз сюжет'})
+
+        response = client.get(url, {'search': 'сюжет'})
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [review['id'] for review in results] == [
+            reviews[0]['id'], reviews[1]['id']], (
+            'Проверьте, что параметр `search` находит отзывы по тексту '
+            'и сортирует их по релевантности'
+        )
+        assert results[1]['snippet'] == (
+            'Отличный <mark>сюжет</mark>, но &lt;b&gt;финал&lt;/b&gt; '
+            'затянут'), (
+            'Проверьте, что в результатах поиска есть экранированный '
+            'фрагмент `snippet` с выделенными совпадениями'
+        )
+        assert 'snippet' not in client.get(url).json()['results'][0]
+
+        response = client.get(url, {'search': 'сюж', 'cursor': ''})
+        page = response.json()
+        assert [review['id'] for review in page['results']] == [
+            reviews[0]['id'], reviews[1]['id']]
+        assert page['next'] is None
+
+        admin_client.delete(f'{url}{reviews[0]["id"]}/')
+        response = client.get(url, {'search': 'сюжет'})
+        assert [review['id'] for review in response.json()['results']] == [
+            reviews[1]['id']], (
+            'Проверьте, что удалённые отзывы пропадают из поиска'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_site_search(self, client, admin_client, admin):
+        comments, reviews, titles, _, moderator = create_comments(
+            admin_client, admin)
+
+        response = client.get('/api/v1/search/reviews/', {'q': 'QWERTY'})
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == 3
+        assert {review['title'] for review in data['results']} == {
+            titles[0]['id']}
+
+        response = client.get('/api/v1/search/comments/', {'q': 'qwerty123'})
+        data = response.json()
+        assert [comment['id'] for comment in data['results']] == [
+            comments[1]['id']], (
+            'Проверьте, что `/api/v1/search/comments/` ищет по комментариям'
+        )
+        assert data['results'][0]['review'] == reviews[0]['id']
+        assert data['results'][0]['title'] == titles[0]['id']
+        assert client.get(
+            '/api/v1/search/comments/',
+            {'q': 'qwerty', 'title': titles[1]['id']}
+        ).json()['count'] == 0
+
+        auth_client(moderator).post(
+            '/api/v1/moderation/reviews/',
+            data=json.dumps({'action': 'hide', 'ids': [reviews[0]['id']]}),
+            content_type='application/json')
+        assert client.get(
+            '/api/v1/search/comments/', {'q': 'qwerty'}).json()['count'] == 0, (
+            'Проверьте, что комментарии к скрытым отзывам не находятся'
+        )
+        assert client.get(
+            '/api/v1/search/reviews/', {'q': 'qwerty'}).json()['count'] == 2
+        assert client.get('/api/v1/search/reviews/').status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild_command(self, client, admin_client, admin):
+        create_comments(admin_client, admin)
+
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM reviews_review_fts')
+            cursor.execute('DELETE FROM reviews_comment_fts')
+        assert client.get(
+            '/api/v1/search/reviews/', {'q': 'qwerty'}).json()['count'] == 0
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        assert client.get(
+            '/api/v1/search/reviews/', {'q': 'qwerty'}).json()['count'] == 3, (
+            'Проверьте, что `rebuild_search_index` индексирует отзывы'
+        )
+        assert client.get(
+            '/api/v1/search/comments/', {'q': 'qwerty'}).json()['count'] == 3
+
+    def fts_deletes(self, context):
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('DELETE FROM reviews_')
+            and '_fts' in query['sql']
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_cascade_unindex(self, client, admin_client, admin):
+        _, reviews, titles, user, _ = create_comments(admin_client, admin)
+        from reviews.models import Comment
+
+        for review in reviews:
+            Comment.objects.bulk_create([
+                Comment(review_id=review['id'], author=user, text='spam')
+                for _ in range(20)
+            ])
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == 204
+        assert len(self.fts_deletes(context)) == 2, (
+            'Проверьте, что каскадно удалённые отзывы и комментарии '
+            'убираются из поискового индекса одним запросом на модель'
+        )
+        assert client.get(
+            '/api/v1/search/reviews/', {'q': 'qwerty123'}).json()['count'] == 0
+
+        with CaptureQueriesContext(connection) as context:
+            admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        # Отзывы, комментарии и само произведение.
+        assert len(self.fts_deletes(context)) == 3
+        assert client.get(
+            '/api/v1/search/comments/', {'q': 'qwerty'}).json()['count'] == 0
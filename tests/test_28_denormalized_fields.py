@@ -0,0 +1,42 @@
+import pytest
+from rest_framework.generics import GenericAPIView
+
+from .common import auth_client, create_comments
+
+
+class Test28DenormalizedFields:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_update_keeps_concurrent_counters(self, admin_client, admin,
+                                                 monkeypatch):
+        _, reviews, titles, user, _ = create_comments(admin_client, admin)
+        from reviews.models import Review, Title
+
+        get_object = GenericAPIView.get_object
+
+        def stale_object(view):
+            # Объект загружен, затем параллельный запрос меняет счётчики.
+            instance = get_object(view)
+            Title.objects.filter(pk=titles[0]['id']).update(
+                rating=9, reviews_count=5)
+            Review.objects.filter(pk=reviews[1]['id']).update(
+                comments_count=4)
+            return instance
+
+        monkeypatch.setattr(GenericAPIView, 'get_object', stale_object)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        admin_client.patch(url, data={'name': 'Новое имя'})
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.name, title.rating, title.reviews_count) == (
+            'Новое имя', 9, 5), (
+            'Проверьте, что изменение произведения не перезаписывает '
+            'рейтинг и число отзывов, изменённые параллельно'
+        )
+
+        auth_client(user).patch(
+            f'{url}reviews/{reviews[1]["id"]}/', data={'text': 'Правка'})
+        review = Review.objects.get(pk=reviews[1]['id'])
+        assert (review.text, review.comments_count) == ('Правка', 4), (
+            'Проверьте, что изменение отзыва не перезаписывает '
+            'comments_count, изменённый параллельно'
+        )